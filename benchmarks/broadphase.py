@@ -0,0 +1,56 @@
+import sys
+import timeit
+import numpy as np
+from server.physics import PlayerBuffer, PLAYER_HALF_SIZE, sweep_players, live_slots
+from server.spatial_hash import SpatialHash, cell_size_for
+from server.simulation import WORLD_SIZE, TICK_RATE, BULLET_SPEED
+
+
+PLAYER_COUNTS = (10, 50, 100, 250, 500)
+BULLET_COUNTS = (100, 1000, 5000)
+
+
+def make_world(player_count, bullet_count, rng, width=WORLD_SIZE[0], height=WORLD_SIZE[1]):
+    players = PlayerBuffer(player_count)
+    for i in range(player_count):
+        players.add(f"player{i}", hp=100)
+    players.positions[:] = rng.uniform((0, 0), (width, height), size=(player_count, 2))
+    starts = rng.uniform((0, 0), (width, height), size=(bullet_count, 2))
+    angles = rng.uniform(-np.pi, np.pi, size=bullet_count)
+    ends = starts + np.stack((np.cos(angles), np.sin(angles)), axis=1) * BULLET_SPEED / TICK_RATE
+    owners = rng.integers(0, player_count, size=bullet_count)
+    return players, (starts, ends), owners
+
+
+def tick(players, segments, owners, spatial_hash):
+    if spatial_hash is not None:
+        slots = live_slots(players)
+        spatial_hash.rebuild(players.positions[slots], slots, PLAYER_HALF_SIZE)
+    return sweep_players(players, *segments, owners, spatial_hash)
+
+
+def main(pixels_per_block=200, repeat=20):
+    rng = np.random.default_rng(0)
+    cell_size = cell_size_for(pixels_per_block, PLAYER_HALF_SIZE * 2)
+    spatial_hash = SpatialHash(cell_size, (0, 0, *WORLD_SIZE))
+    print(f"hash cell size {spatial_hash.cell_size:.1f} px (tiles of {pixels_per_block} px)")
+    print(f"{'players':>8} {'bullets':>8} {'brute ms':>10} {'hash ms':>10} {'speedup':>8}")
+
+    for player_count in PLAYER_COUNTS:
+        for bullet_count in BULLET_COUNTS:
+            players, segments, owners = make_world(player_count, bullet_count, rng)
+
+            brute = tick(players, segments, owners, None)
+            hashed = tick(players, segments, owners, spatial_hash)
+            assert (brute[0] == hashed[0]).all() and (brute[1][brute[0]] == hashed[1][hashed[0]]).all()
+
+            brute_time = timeit.timeit(lambda: tick(players, segments, owners, None), number=repeat) / repeat
+            hash_time = timeit.timeit(lambda: tick(players, segments, owners, spatial_hash), number=repeat) / repeat
+            print(
+                f"{player_count:>8} {bullet_count:>8} {brute_time * 1000:>10.3f} "
+                f"{hash_time * 1000:>10.3f} {brute_time / hash_time:>7.1f}x"
+            )
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
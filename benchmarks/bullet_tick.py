@@ -0,0 +1,43 @@
+import math
+import random
+import sys
+import timeit
+from loguru import logger
+from collision import CollisionGrid
+from server.simulation import Simulation, MAX_PLAYERS
+
+
+def populate(simulation, players, bullets, rng):
+    for i in range(players):
+        player_id = f"player{i}"
+        simulation.add_player(player_id)
+        # Placed directly, the server only moves players from their inputs.
+        slot = simulation.players.slots[player_id]
+        simulation.players.positions[slot] = rng.uniform(0, 800), rng.uniform(0, 600)
+        simulation.players.directions[slot] = rng.uniform(-math.pi, math.pi)
+    for i in range(bullets):
+        simulation.spawn_bullet(f"player{i % players}")
+
+
+def tick_time(players, bullets, ticks=50):
+    rng = random.Random(0)
+    simulation = Simulation(CollisionGrid(["A A", "   ", "A A"], 200, (100, 0)))
+    simulation.players = type(simulation.players)(max(players, MAX_PLAYERS), simulation.max_rewind_ticks + 1)
+    populate(simulation, players, bullets, rng)
+    total = 0
+    for _ in range(ticks):
+        total += timeit.timeit(lambda: simulation.update_bullets(simulation.dt), number=1)
+        # Refill what the tick removed so every tick sees the same load.
+        for i in range(bullets - simulation.bullets.count):
+            simulation.spawn_bullet(f"player{i % players}")
+    return total / ticks
+
+
+def main(players=50, bullets=500):
+    logger.remove()
+    seconds = tick_time(players, bullets)
+    print(f"{players} players, {bullets} bullets: {seconds * 1000:.3f} ms/tick")
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
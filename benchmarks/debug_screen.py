@@ -0,0 +1,55 @@
+import os
+import sys
+import time
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+import pygame as pg
+from client.debugscreen import DebugScreen
+
+
+# What the client shows. The throttled ones change every frame, the rest about once a second.
+ENTRIES = ("FPS", "Snapshots", "Sends", "RTT", "Interp buffer", "HP")
+THROTTLED = {"FPS": 0.5, "RTT": 0.25, "Interp buffer": 0.25}
+
+
+def render_every_frame(debug_screen):
+    # DebugScreen.draw before the overlay was cached.
+    for i, (name, box) in enumerate(debug_screen.values.items()):
+        text = debug_screen.font.render(f"{name}: {box.value}", False, (255, 255, 255))
+        debug_screen.screen.blit(text, (10, 10 + i * (debug_screen.font.get_height() + 5)))
+
+
+def frames_per_second(screen, draw, seconds):
+    debug_screen = DebugScreen(screen)
+    for name, interval in THROTTLED.items():
+        debug_screen.throttle(name, interval)
+    frames = 0
+    drawing = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        frames += 1
+        elapsed = int(time.perf_counter() - start)
+        for name in ENTRIES:
+            debug_screen.set_value(name, frames if name in THROTTLED else elapsed)
+        screen.fill((0, 0, 0))
+        draw_start = time.perf_counter()
+        draw(debug_screen)
+        drawing += time.perf_counter() - draw_start
+        pg.display.flip()
+    return frames / (time.perf_counter() - start), drawing / frames
+
+
+def main(seconds=3):
+    pg.init()
+    screen = pg.display.set_mode((800, 600))
+    print(f"{len(ENTRIES)} debug entries, {os.environ['SDL_VIDEODRIVER']} video driver")
+    print(f"{'':>20} {'FPS':>8} {'overlay us/frame':>17}")
+    uncached, uncached_draw = frames_per_second(screen, render_every_frame, seconds)
+    cached, cached_draw = frames_per_second(screen, DebugScreen.draw, seconds)
+    print(f"{'render every frame':>20} {uncached:>8.0f} {uncached_draw * 1e6:>17.1f}")
+    print(f"{'cached overlay':>20} {cached:>8.0f} {cached_draw * 1e6:>17.1f}")
+    print(f"{cached / uncached:.2f}x the frame rate, {uncached_draw / cached_draw:.1f}x less time in the overlay")
+    pg.quit()
+
+
+if __name__ == '__main__':
+    main(*map(float, sys.argv[1:]))
@@ -0,0 +1,51 @@
+import random
+import sys
+import timeit
+import pygame as pg
+from collision import CollisionGrid
+
+
+# Same full-map scan GameServicer.inside_wall used before the collision grid.
+def scan_inside_wall(text_map, ppb, map_top_left, x, y):
+    for cy, row in enumerate(text_map):
+        for cx, cell in enumerate(row):
+            if cell == ' ':
+                continue
+
+            cell_rect = pg.Rect(cx * ppb + map_top_left[0], cy * ppb + map_top_left[1], ppb, ppb)
+            if cell_rect.collidepoint(x, y):
+                return True
+
+    return False
+
+
+def random_map(width, height, density=0.2):
+    rng = random.Random(0)
+    return [''.join('A' if rng.random() < density else ' ' for _ in range(width)) for _ in range(height)]
+
+
+def main(width=200, height=150, points=200):
+    text_map = random_map(width, height)
+    ppb = max(1, min(800 // width, 600 // height))
+    origin = (400 - ppb * width // 2, 300 - ppb * height // 2)
+    grid = CollisionGrid(text_map, ppb, origin)
+
+    rng = random.Random(1)
+    samples = [(rng.uniform(0, 800), rng.uniform(0, 600)) for _ in range(points)]
+
+    for x, y in samples:
+        assert grid.is_solid(x, y) == scan_inside_wall(text_map, ppb, origin, x, y)
+
+    scan_time = timeit.timeit(lambda: [scan_inside_wall(text_map, ppb, origin, x, y) for x, y in samples], number=1)
+    grid_time = timeit.timeit(lambda: [grid.is_solid(x, y) for x, y in samples], number=100) / 100
+    build_time = timeit.timeit(lambda: CollisionGrid(text_map, ppb, origin), number=10) / 10
+
+    print(f"map {width}x{height}, {points} lookups")
+    print(f"scan:  {scan_time / points * 1e6:10.2f} us/lookup")
+    print(f"grid:  {grid_time / points * 1e6:10.2f} us/lookup")
+    print(f"build: {build_time * 1e3:10.2f} ms (once per map load)")
+    print(f"speedup: {scan_time / grid_time:.0f}x")
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
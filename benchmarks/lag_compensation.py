@@ -0,0 +1,80 @@
+import sys
+import timeit
+import numpy as np
+from server.physics import PlayerBuffer, PLAYER_HALF_SIZE, sweep_players, live_slots
+from server.spatial_hash import SpatialHash, cell_size_for
+from server.simulation import WORLD_SIZE, TICK_RATE, BULLET_SPEED, MAX_REWIND, MAX_PLAYERS
+from movement import PLAYER_SPEED
+
+
+PLAYER_COUNTS = (16, 64, 250)
+BULLET_COUNTS = (100, 1000)
+TICK_RATES = (30, 60, 128)
+
+
+def make_world(player_count, bullet_count, history_length, rng, width=WORLD_SIZE[0], height=WORLD_SIZE[1]):
+    players = PlayerBuffer(player_count, history_length)
+    for i in range(player_count):
+        players.add(f"player{i}", hp=100)
+    positions = rng.uniform((0, 0), (width, height), size=(player_count, 2))
+    velocities = rng.uniform(-1, 1, size=(player_count, 2)) * PLAYER_SPEED / TICK_RATE
+    # Fill the whole history with players walking at full speed, so rewinds actually move them.
+    for tick in range(history_length):
+        players.positions[:] = np.clip(positions + velocities * tick, (0, 0), (width, height))
+        players.record(tick)
+    tick = history_length - 1
+
+    starts = rng.uniform((0, 0), (width, height), size=(bullet_count, 2))
+    angles = rng.uniform(-np.pi, np.pi, size=bullet_count)
+    ends = starts + np.stack((np.cos(angles), np.sin(angles)), axis=1) * BULLET_SPEED / TICK_RATE
+    owners = rng.integers(0, player_count, size=bullet_count)
+    rewinds = rng.integers(0, history_length, size=bullet_count)
+    return players, (starts, ends), owners, rewinds, tick
+
+
+def step(players, segments, owners, rewinds, tick, spatial_hash):
+    players.record(tick)
+    if spatial_hash is not None:
+        slots = live_slots(players)
+        spatial_hash.rebuild(players.positions[slots], slots, PLAYER_HALF_SIZE)
+    return sweep_players(players, *segments, owners, spatial_hash, rewinds, tick)
+
+
+def memory():
+    print(f"history memory, {MAX_REWIND * 1000:.0f} ms rewind window")
+    print(f"{'tick rate':>10} {'ticks':>6} {'per player':>11} {f'{MAX_PLAYERS} players':>12}")
+    for tick_rate in TICK_RATES:
+        history_length = round(MAX_REWIND * tick_rate) + 1
+        players = PlayerBuffer(MAX_PLAYERS, history_length)
+        print(
+            f"{tick_rate:>10} {history_length:>6} {players.history.nbytes / MAX_PLAYERS:>9.0f} B "
+            f"{players.history.nbytes / 1024:>9.1f} KiB"
+        )
+
+
+def main(pixels_per_block=200, repeat=20):
+    memory()
+    rng = np.random.default_rng(0)
+    history_length = round(MAX_REWIND * TICK_RATE) + 1
+    spatial_hash = SpatialHash(cell_size_for(pixels_per_block, PLAYER_HALF_SIZE * 2), (0, 0, *WORLD_SIZE))
+    print(f"\nper-tick cost at {TICK_RATE} Hz, rewinds of 0-{history_length - 1} ticks")
+    print(f"{'players':>8} {'bullets':>8} {'hash ms':>9} {'rewound':>9} {'brute ms':>9} {'rewound':>9}")
+
+    for player_count in PLAYER_COUNTS:
+        for bullet_count in BULLET_COUNTS:
+            players, segments, owners, rewinds, tick = make_world(player_count, bullet_count, history_length, rng)
+            no_rewinds = np.zeros_like(rewinds)
+
+            brute = step(players, segments, owners, rewinds, tick, None)
+            hashed = step(players, segments, owners, rewinds, tick, spatial_hash)
+            assert (brute[0] == hashed[0]).all() and (brute[1][brute[0]] == hashed[1][hashed[0]]).all()
+
+            times = [
+                timeit.timeit(lambda: step(players, segments, owners, r, tick, h), number=repeat) / repeat * 1000
+                for h in (spatial_hash, None) for r in (no_rewinds, rewinds)
+            ]
+            print(f"{player_count:>8} {bullet_count:>8} " + ' '.join(f"{t:>9.3f}" for t in times))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,97 @@
+import sys
+import time
+import random
+import asyncio
+import subprocess
+import multiprocessing
+import numpy as np
+import grpc
+import game_pb2
+import game_pb2_grpc
+
+
+MODES = ('threads', 'aio')
+CLIENT_COUNTS = (10, 100, 1000)
+UPDATE_RATE = 30
+# The simulated clients are spread over a few processes so the load generator isn't what saturates first.
+CLIENT_PROCESSES = 4
+PORT = 12400
+
+
+async def run_client(stub, player_id, duration, latencies):
+    await stub.Join(game_pb2.JoinRequest(player_id=player_id))
+    request = game_pb2.UpdateRequest(client_id=player_id, position=game_pb2.Vec2(x=400, y=300))
+    # Clients start spread over one update interval, like real ones would.
+    await asyncio.sleep(random.uniform(0, 1 / UPDATE_RATE))
+    next_send = time.perf_counter()
+    end = next_send + duration
+    while next_send < end:
+        start = time.perf_counter()
+        await stub.Update(request)
+        latencies.append(time.perf_counter() - start)
+        next_send += 1 / UPDATE_RATE
+        await asyncio.sleep(max(next_send - time.perf_counter(), 0))
+    await stub.Leave(game_pb2.LeaveRequest(player_id=player_id))
+
+
+async def run_clients(port, first, count, duration):
+    latencies = []
+    async with grpc.aio.insecure_channel(f'localhost:{port}') as channel:
+        stub = game_pb2_grpc.GameStub(channel)
+        await asyncio.gather(*(
+            run_client(stub, f"bot{i}", duration, latencies) for i in range(first, first + count)
+        ))
+    return latencies
+
+
+def client_process(args):
+    return asyncio.run(run_clients(*args))
+
+
+def start_server(mode, port, workers):
+    command = [sys.executable, 'main_server.py', '--port', str(port), '--workers', str(workers), '--metrics-port', '0']
+    if mode == 'aio':
+        command.append('--aio')
+    process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, text=True)
+    with grpc.insecure_channel(f'localhost:{port}') as channel:
+        grpc.channel_ready_future(channel).result(timeout=30)
+    return process
+
+
+def stop_server(process):
+    process.stdin.write('exit\n')
+    process.stdin.flush()
+    try:
+        process.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def main(duration=5, workers=0):
+    context = multiprocessing.get_context('spawn')
+    print(f"{UPDATE_RATE} Hz unary Update per client for {duration} s, {CLIENT_PROCESSES} client processes")
+    print(f"{'mode':>8} {'clients':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8} {'updates/s':>10} {'target/s':>9}")
+
+    for mode in MODES:
+        for client_count in CLIENT_COUNTS:
+            port = PORT
+            server = start_server(mode, port, workers)
+            try:
+                shares = np.array_split(np.arange(client_count), CLIENT_PROCESSES)
+                jobs = [(port, int(share[0]), len(share), duration) for share in shares if len(share)]
+                start = time.perf_counter()
+                with context.Pool(len(jobs)) as pool:
+                    latencies = np.concatenate([np.array(result) for result in pool.map(client_process, jobs)])
+                elapsed = time.perf_counter() - start
+            finally:
+                stop_server(server)
+
+            p50, p90, p99 = np.percentile(latencies, (50, 90, 99)) * 1000
+            print(
+                f"{mode:>8} {client_count:>8} {p50:>8.2f} {p90:>8.2f} {p99:>8.2f} {latencies.max() * 1000:>8.2f} "
+                f"{len(latencies) / elapsed:>10.0f} {client_count * UPDATE_RATE:>9}"
+            )
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,49 @@
+import sys
+import subprocess
+import statistics
+
+
+# Each case runs in a fresh interpreter, so import time and peak RSS are measured from a cold start.
+HEADLESS = '''
+import time, sys, resource
+start = time.perf_counter()
+from server.server import GameServicer
+servicer = GameServicer(workers=0)
+elapsed = time.perf_counter() - start
+print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, 'pygame' in sys.modules)
+servicer.rooms.stop()
+'''
+
+# What the server used to do on top: import pygame and draw the map onto a Surface.
+WITH_RENDERER = '''
+import time, sys, resource
+start = time.perf_counter()
+from server.server import GameServicer
+servicer = GameServicer(workers=0)
+import pygame
+from Map import Map
+Map(servicer.map, servicer.map_data.colors)
+elapsed = time.perf_counter() - start
+print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, 'pygame' in sys.modules)
+servicer.rooms.stop()
+'''
+
+
+def measure(code, repeat):
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+        seconds, rss_kib, pygame_loaded = output.split()[-3:]
+        runs.append((float(seconds), int(rss_kib), pygame_loaded))
+    return statistics.median(r[0] for r in runs), statistics.median(r[1] for r in runs), runs[0][2]
+
+
+def main(repeat=5):
+    print(f"{'case':>14} {'startup ms':>11} {'peak RSS MiB':>13} {'pygame':>7}")
+    for name, code in (('headless', HEADLESS), ('with pygame', WITH_RENDERER)):
+        seconds, rss_kib, pygame_loaded = measure(code, repeat)
+        print(f"{name:>14} {seconds * 1000:>11.1f} {rss_kib / 1024:>13.1f} {pygame_loaded:>7}")
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,235 @@
+import asyncio
+import math
+import random
+import time
+import numpy as np
+import grpc
+from collections import deque
+from loguru import logger
+import game_pb2
+import game_pb2_grpc
+from movement import INPUT_RATE as MOVE_RATE
+
+
+HOST = 'localhost:12345'
+INPUT_RATE = 30
+WORLD_SIZE = (800, 600)
+# How close to the pattern a bot has to be before it stops steering on that axis.
+DEADZONE = 4
+# Upper bucket edges in ms, the last one catches everything slower.
+LATENCY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, math.inf)
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self.samples = []
+
+    def record(self, seconds):
+        self.samples.append(seconds * 1000)
+
+    def summary(self):
+        if not self.samples:
+            return "no samples"
+        samples = np.array(self.samples)
+        p50, p90, p99 = np.percentile(samples, (50, 90, 99))
+        return f"n={len(samples)} p50={p50:.2f} ms p90={p90:.2f} ms p99={p99:.2f} ms max={samples.max():.2f} ms"
+
+    def bars(self, width=40):
+        counts = np.histogram(self.samples, bins=(0, *LATENCY_BUCKETS))[0]
+        most = max(counts.max(), 1)
+        lines = []
+        for edge, count in zip(LATENCY_BUCKETS, counts):
+            label = f"<{edge:g} ms" if math.isfinite(edge) else f">={LATENCY_BUCKETS[-2]:g} ms"
+            lines.append(f"{label:>10} {count:>7} {'#' * round(count / most * width)}")
+        return '\n'.join(lines)
+
+
+class SwarmStats:
+    def __init__(self):
+        self.rpcs = {name: LatencyHistogram() for name in ('Join', 'Leave')}
+        # Send to acknowledgement of an input in a snapshot, the latency players feel while playing.
+        self.input_acks = LatencyHistogram()
+        self.inputs_sent = 0
+        self.shots_sent = 0
+        self.snapshots_received = 0
+        self.bytes_received = 0
+        # Arrival gap minus the server time between two snapshots, i.e. how unevenly ticks reach the client.
+        self.tick_jitter = LatencyHistogram()
+        self.errors = 0
+        self.started = time.perf_counter()
+
+    def report(self, bots):
+        elapsed = time.perf_counter() - self.started
+        lines = [
+            f"{bots} bots for {elapsed:.1f} s, {self.errors} errors",
+            f"inputs {self.inputs_sent / elapsed:.0f}/s with {self.shots_sent / elapsed:.0f} shots/s, "
+            f"snapshots {self.snapshots_received / elapsed:.0f}/s "
+            f"({self.snapshots_received / elapsed / max(bots, 1):.1f}/s per bot), "
+            f"{self.bytes_received / elapsed / 1024:.1f} KiB/s received",
+            f"tick jitter: {self.tick_jitter.summary()}",
+        ]
+        if self.tick_jitter.samples:
+            lines.append(self.tick_jitter.bars())
+        for name, histogram in self.rpcs.items():
+            lines.append(f"{name}: {histogram.summary()}")
+        lines.append(f"Input ack: {self.input_acks.summary()}")
+        return '\n'.join(lines)
+
+
+def circle(t, seed):
+    radius = 50 + seed * 150
+    return WORLD_SIZE[0] / 2 + radius * math.cos(t + seed * 6), WORLD_SIZE[1] / 2 + radius * math.sin(t + seed * 6)
+
+
+def zigzag(t, seed):
+    phase = (t * 0.2 + seed) % 2
+    x = abs(phase - 1) * (WORLD_SIZE[0] - 40) + 20
+    return x, 40 + seed * (WORLD_SIZE[1] - 80) + 30 * math.sin(t * 3)
+
+
+def wander(t, seed):
+    return (
+        WORLD_SIZE[0] / 2 + 300 * math.sin(t * 0.31 + seed * 11) * math.cos(t * 0.17),
+        WORLD_SIZE[1] / 2 + 220 * math.sin(t * 0.23 + seed * 7)
+    )
+
+
+PATTERNS = (circle, zigzag, wander)
+
+
+class Bot:
+    def __init__(self, stub, player_id, pattern, stats, room_id='', shoot_interval=0.5):
+        self.stub = stub
+        self.player_id = player_id
+        self.pattern = pattern
+        self.seed = random.random()
+        self.stats = stats
+        self.room_id = room_id
+        self.shoot_interval = shoot_interval
+        self.tick_rate = None
+        self.acked_snapshot_id = 0
+        self.input_seq = 0
+        # (last input seq, send time) of recent sends until a snapshot acknowledges them.
+        # Bounded, so sends that are never acknowledged can't pile up.
+        self.in_flight = deque(maxlen=INPUT_RATE)
+        self.shots = 0
+        self.position = None
+        self.running = False
+
+    async def timed(self, name, call, request):
+        start = time.perf_counter()
+        try:
+            response = await call(request)
+        except grpc.aio.AioRpcError as e:
+            self.stats.errors += 1
+            logger.warning(f"{self.player_id}: {name} failed: {e.code()}")
+            return None
+        self.stats.rpcs[name].record(time.perf_counter() - start)
+        return response
+
+    async def run(self, duration):
+        response = await self.timed('Join', self.stub.Join, game_pb2.JoinRequest(player_id=self.player_id, room_id=self.room_id))
+        if response is None or not response.success:
+            self.stats.errors += 1
+            return
+        self.tick_rate = response.tick_rate
+        self.running = True
+        # Bots don't all start on the same frame, like real clients.
+        await asyncio.sleep(random.uniform(0, 1 / INPUT_RATE))
+
+        shooter = asyncio.create_task(self.shoot_loop())
+        try:
+            await asyncio.wait_for(self.play(), duration)
+        except asyncio.TimeoutError:
+            pass
+        except grpc.aio.AioRpcError as e:
+            self.stats.errors += 1
+            logger.warning(f"{self.player_id}: Play failed: {e.code()}")
+        self.running = False
+        shooter.cancel()
+        await self.timed('Leave', self.stub.Leave, game_pb2.LeaveRequest(player_id=self.player_id))
+
+    async def inputs(self):
+        start = time.perf_counter()
+        next_send = start
+        while self.running:
+            t = time.perf_counter() - start
+            x, y = self.pattern(t, self.seed)
+            next_x, next_y = self.pattern(t + 0.1, self.seed)
+            # Aim where it is heading, with a slow sweep on top so shots fan out.
+            direction = math.atan2(next_y - y, next_x - x) + math.sin(t * 2) * 0.5
+            # Bots send movement like real clients do: one input per movement step, steering towards the pattern.
+            moves = []
+            for _ in range(MOVE_RATE // INPUT_RATE):
+                self.input_seq += 1
+                move_x, move_y = self.steer(x, y)
+                # Shots ride along with the next input, like clicks do in the real client.
+                actions = [game_pb2.Action(type=game_pb2.SHOOT)] * self.shots
+                self.stats.shots_sent += self.shots
+                self.shots = 0
+                moves.append(game_pb2.MoveInput(
+                    seq=self.input_seq, move_x=move_x, move_y=move_y, direction=direction, actions=actions
+                ))
+            self.in_flight.append((self.input_seq, time.perf_counter()))
+            yield game_pb2.UpdateRequest(
+                client_id=self.player_id, direction=direction,
+                ack_snapshot_id=self.acked_snapshot_id, inputs=moves
+            )
+            self.stats.inputs_sent += 1
+            next_send += 1 / INPUT_RATE
+            await asyncio.sleep(max(next_send - time.perf_counter(), 0))
+
+    def steer(self, x, y):
+        if self.position is None:
+            return 0, 0
+        dx, dy = x - self.position[0], y - self.position[1]
+        return (dx > DEADZONE) - (dx < -DEADZONE), (dy > DEADZONE) - (dy < -DEADZONE)
+
+    async def play(self):
+        previous = None
+        async for response in self.stub.Play(self.inputs()):
+            arrived = time.perf_counter()
+            self.stats.snapshots_received += 1
+            self.stats.bytes_received += response.ByteSize()
+            self.acked_snapshot_id = response.snapshot_id
+            for state in response.states:
+                if state.client_id == self.player_id:
+                    self.position = state.position.x, state.position.y
+                    self.acknowledge_inputs(state.last_input_seq, arrived)
+            if previous is not None and response.server_tick > previous[1]:
+                expected = (response.server_tick - previous[1]) / self.tick_rate
+                self.stats.tick_jitter.record(abs(arrived - previous[0] - expected))
+            previous = arrived, response.server_tick
+
+    def acknowledge_inputs(self, last_input_seq, arrived):
+        while self.in_flight and self.in_flight[0][0] <= last_input_seq:
+            _, sent = self.in_flight.popleft()
+            self.stats.input_acks.record(arrived - sent)
+
+    async def shoot_loop(self):
+        while self.running:
+            await asyncio.sleep(self.shoot_interval * random.uniform(0.5, 1.5))
+            self.shots += 1
+
+
+async def run_swarm(host=HOST, bots=100, duration=30, room_id='', shoot_interval=0.5, report_interval=5, ramp_up=2):
+    stats = SwarmStats()
+    async with grpc.aio.insecure_channel(host) as channel:
+        stub = game_pb2_grpc.GameStub(channel)
+        swarm = []
+        for i in range(bots):
+            bot = Bot(stub, f"bot{i}", PATTERNS[i % len(PATTERNS)], stats, room_id, shoot_interval)
+            swarm.append(asyncio.create_task(bot.run(duration)))
+            # Joins are spread over the ramp-up so the server isn't hit by all of them at once.
+            await asyncio.sleep(ramp_up / bots)
+
+        async def report():
+            while True:
+                await asyncio.sleep(report_interval)
+                logger.info(f"\n{stats.report(bots)}")
+
+        reporter = asyncio.create_task(report())
+        await asyncio.gather(*swarm)
+        reporter.cancel()
+    logger.success(f"Swarm finished:\n{stats.report(bots)}")
+    return stats
@@ -0,0 +1,77 @@
+from collections import OrderedDict
+from loguru import logger
+import pygame as pg
+import threading
+import time
+
+
+FONT_PATH = 'assets/Tiny5-Regular.ttf'
+BULLET_PATH = 'assets/bullet.png'
+NAME_FONT_SIZE = 14
+DEBUG_FONT_SIZE = 20
+GAME_OVER_TEXT = ("You are dead!", 40, (255, 100, 100))
+# Names of players that left are dropped once this many newer ones were rendered.
+MAX_NAME_SURFACES = 256
+
+
+class Assets:
+    # Loaded on first use and shared by the whole process. Needs pg.init() and a display mode set first.
+    def __init__(self):
+        self.fonts = {}
+        self.images = {}
+        self.texts = {}
+        self.names = OrderedDict()
+        self.load_times = {}
+        # Players are created on the network thread while the main thread draws.
+        self.lock = threading.RLock()
+
+    def load(self, cache, key, label, loader):
+        with self.lock:
+            if key not in cache:
+                start = time.perf_counter()
+                cache[key] = loader()
+                self.load_times[label] = time.perf_counter() - start
+            return cache[key]
+
+    def font(self, size):
+        return self.load(self.fonts, size, f"font {size}px", lambda: pg.font.Font(FONT_PATH, size))
+
+    def image(self, path, scale=1):
+        def load():
+            image = pg.image.load(path).convert_alpha()
+            return pg.transform.scale_by(image, scale) if scale != 1 else image
+        return self.load(self.images, (path, scale), f"{path} x{scale}", load)
+
+    def bullet_sprite(self):
+        return self.image(BULLET_PATH, 2)
+
+    def text(self, text, size, color=(255, 255, 255)):
+        # Fixed strings only, every distinct one stays cached.
+        return self.load(
+            self.texts, (text, size, color), f"text {text!r}", lambda: self.font(size).render(text, False, color)
+        )
+
+    def name(self, name):
+        with self.lock:
+            surface = self.names.get(name)
+            if surface is not None:
+                self.names.move_to_end(name)
+                return surface
+            surface = self.font(NAME_FONT_SIZE).render(name, False, (255, 255, 255))
+            self.names[name] = surface
+            if len(self.names) > MAX_NAME_SURFACES:
+                self.names.popitem(last=False)
+            return surface
+
+    def preload(self):
+        start = time.perf_counter()
+        self.font(NAME_FONT_SIZE)
+        self.font(DEBUG_FONT_SIZE)
+        self.bullet_sprite()
+        self.text(*GAME_OVER_TEXT)
+        for label, seconds in self.load_times.items():
+            logger.debug(f"Loaded {label} in {seconds * 1000:.2f} ms")
+        logger.info(f"Loaded {len(self.load_times)} assets in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+assets = Assets()
@@ -8,6 +8,12 @@ from loguru import logger
 import math
 from client.debugscreen import DebugScreen
 from Map import Map
+from map_geometry import MapGeometry
+from client.map_cache import fetch_map
+from client.interpolation import SnapshotBuffer, INTERPOLATION_DELAY
+from client.assets import assets, GAME_OVER_TEXT
+from movement import move_player, INPUT_STEP
+from collections import deque
 
 
 def lerp(a, b, t):
@@ -18,129 +24,48 @@ def step(n, s):
     return round(n / s) * s
 
 
-def clamp(value, min_value, max_value):
-    return max(min(value, max_value), min_value)
-
 HOST = '35.156.54.176:51080'
+SNAPSHOT_HISTORY = 64
+# About ten seconds of inputs; if the server acknowledges none of them for that long, prediction gives up on the oldest.
+MAX_PENDING_INPUTS = 600
+SEND_RATE = 30
+# Requests the server hasn't acknowledged yet, about half a second of sends. Past this the link is congested:
+# sends are skipped and their inputs go out with the next one.
+MAX_IN_FLIGHT = 16
+# A request unacknowledged for this long is counted as lost, so a dropped ack can't block sending.
+IN_FLIGHT_TIMEOUT = 2
 
 class Player:
     radius = 10
     def __init__(self, position, direction, name):
         self.position = position
         self.direction = direction
-        self.last_position = position
-        self.last_direction = direction
-        self.speed = 200
         self.name = name
-        self.last_update = time.time()
-        self.last_last_update = time.time()
-        self.name_surface = GameClient.instance.font.render(self.name, False, (255, 255, 255))
-        self.interpolation = 0
-        self.interpolate = True
-        self.interpolated_position = self.position.copy()
+        self.name_surface = assets.name(self.name)
         self.hp = 100
         self.main_player = False
-        big_font = pg.font.Font('assets/Tiny5-Regular.ttf', 40)
-        self.gameover = big_font.render("You are dead!", False, (255, 100, 100))
-
-    def update_pos_and_dir(self, position, direction):
-        self.last_position = self.position.copy()
-        self.last_direction = self.direction
-        self.position = position.copy()
-        self.direction = direction
-        self.last_last_update = self.last_update
-        self.last_update = time.time()
 
-    def move(self, dt):
-        if self.dead():
-            return
-        
+    def read_movement(self):
         keys = pg.key.get_pressed()
-        movement = pg.Vector2(0, 0)
+        move_x, move_y = 0, 0
 
         if keys[pg.K_w]:
-            movement.y -= 1
+            move_y -= 1
         elif keys[pg.K_s]:
-            movement.y += 1
+            move_y += 1
         
         if keys[pg.K_a]:
-            movement.x -= 1
+            move_x -= 1
         elif keys[pg.K_d]:
-            movement.x += 1
-
-        if movement.length_squared() > 0:
-            movement = movement.normalize()
-
-        position = self.position.copy()
-        position.x += movement.x * self.speed * dt
-        position.y += movement.y * self.speed * dt
+            move_x += 1
 
-        position.x = clamp(position.x, self.radius, GameClient.instance.w - self.radius)
-        position.y = clamp(position.y, self.radius, GameClient.instance.h - self.radius)
+        return move_x, move_y
 
-        collides, where = self.collides_with_map(position)
-        if not collides:
-            self.position = position
-        
-        # match where:
-        #     case 'up':
-        #         self.position.x = position.x
-        #         self.position.y = position.y + 1
-        #     case 'down':
-        #         self.position.x = position.x
-        #         self.position.y = position.y - 1
-        #     case 'left':
-        #         self.position.y = position.y
-        #         self.position.x = position.x + 1
-        #     case 'right':
-        #         self.position.y = position.y
-        #         self.position.x = position.x - 1
-            
-
-    def collides_with_map(self, position: pg.Vector2):
-        if GameClient.instance.text_map is None or GameClient.instance.map is None:
-            return True, -1
-        
-        ppb = GameClient.instance.map.pixels_per_block
-        collision_box = pg.Rect(position.x - self.radius, position.y - self.radius, self.radius * 2, self.radius * 2)
-        map_top_left = GameClient.instance.map.rect.topleft
-
-        for y, row in enumerate(GameClient.instance.text_map):
-            for x, cell in enumerate(row):
-                if cell == ' ':
-                    continue
-
-                cell_rect = pg.Rect(x * ppb + map_top_left[0], y * ppb + map_top_left[1], ppb, ppb)
-                if collision_box.colliderect(cell_rect):
-                    return True, self.collision_direction(cell_rect, collision_box)
-        
-        return False, -1
-    
-    def collision_direction(self, a, b):
-        a_center_x = a.x + a.w / 2
-        a_center_y = a.y + a.h / 2
-        b_center_x = b.x + b.w / 2
-        b_center_y = b.y + b.h / 2
-
-        dx = b_center_x - a_center_x
-        dy = b_center_y - a_center_y
-
-        half_widths = (a.w + b.w) / 2
-        half_heights = (a.h + b.h) / 2
-
-        overlap_x = half_widths - abs(dx)
-        overlap_y = half_heights - abs(dy)
-
-        if overlap_x < overlap_y:
-            if dx > 0:
-                return "left" 
-            else:
-                return "right"
-        else:
-            if dy > 0:
-                return "up" 
-            else:
-                return "down"
+    def move(self, move_x, move_y):
+        if self.dead():
+            return
+        x, y = move_player(GameClient.instance.collision_grid, self.position.x, self.position.y, move_x, move_y)
+        self.position = pg.Vector2(x, y)
 
     def update_direction(self):
         mx, my = pg.mouse.get_pos()
@@ -153,9 +78,7 @@ class Player:
         self.direction = math.atan2(dy, dx)
 
     def update(self, dt):
-        self.move(dt)
         self.update_direction()
-        self.interpolation = (time.time() - self.last_last_update) / (self.last_update - self.last_last_update)
     
     def dead(self):
         return self.hp <= 0
@@ -166,55 +89,66 @@ class Player:
             self.draw_sight_line(screen)
             self.draw_name(screen)
         elif self.main_player:
-            screen.blit(self.gameover, self.gameover.get_rect(center=(400, 300)))          
+            gameover = assets.text(*GAME_OVER_TEXT)
+            screen.blit(gameover, gameover.get_rect(center=(400, 300)))          
 
     def draw_sight_line(self, screen):
-        if not self.interpolate:
-            offset = pg.Vector2(math.cos(self.direction) * 20, math.sin(self.direction) * 20)
-            pg.draw.line(screen, (0, 255, 0), self.position, self.position + offset, 2)
-            return
-
-        direction = self.last_direction + self.interpolation * (self.direction - self.last_direction)
-        offset = pg.Vector2(math.cos(direction) * 20, math.sin(direction) * 20)
-        dp = self.position - self.last_position
-        position = self.last_position.copy()
-        position.x += dp.x * self.interpolation
-        position.y += dp.y * self.interpolation
-        
-        pg.draw.line(screen, (0, 255, 0), position, position + offset, 2)
+        offset = pg.Vector2(math.cos(self.direction) * 20, math.sin(self.direction) * 20)
+        pg.draw.line(screen, (0, 255, 0), self.position, self.position + offset, 2)
 
     def draw_name(self, screen):
-        if not self.interpolate:
-            screen.blit(self.name_surface, (self.position.x - self.name_surface.get_width() // 2, self.position.y - 30))
-            return
-        dp = self.position - self.last_position
-        position = self.last_position.copy()
-        position.x += dp.x * self.interpolation
-        position.y += dp.y * self.interpolation
-        screen.blit(self.name_surface, (position.x - self.name_surface.get_width() // 2, position.y - 30))
+        screen.blit(self.name_surface, (self.position.x - self.name_surface.get_width() // 2, self.position.y - 30))
 
     def draw_circle(self, screen):
-        if not self.interpolate:
-            pg.draw.circle(screen, (0, 0, 255), self.position, self.radius)
-            return
-        dp = self.position - self.last_position
-        position = self.last_position.copy()
-        position.x += dp.x * self.interpolation
-        position.y += dp.y * self.interpolation
-        pg.draw.circle(screen, (255, 0, 0), position, self.radius)
+        color = (0, 0, 255) if self.main_player else (255, 0, 0)
+        pg.draw.circle(screen, color, self.position, self.radius)
+
+class SimulatedBullet:
+    def __init__(self, spawn, age, speed):
+        self.direction = pg.Vector2(spawn.direction.x, spawn.direction.y)
+        self.position = pg.Vector2(spawn.position.x, spawn.position.y) + self.direction * speed * age
+        self.angle = math.atan2(-self.direction.y, self.direction.x)
+
 
 class Bullets:
     def __init__(self):
-        self.bullets = []
+        self.bullets = {}
+        self.finished = set()
+        self.lock = threading.Lock()
         self.bullet_sprites = {}
-        self.raw_bullet_sprite = pg.transform.scale_by(pg.image.load("assets/bullet.png").convert_alpha(), 2)
+        self.raw_bullet_sprite = assets.bullet_sprite()
         self.angle_count = 36
+        self.speed = 500
+        self.tick_rate = 60
     
-    def add(self, bullet):
-        self.bullets.append(bullet)
+    def sync(self, spawns, server_tick):
+        with self.lock:
+            for bullet_id in [bullet_id for bullet_id in self.bullets if bullet_id not in spawns]:
+                del self.bullets[bullet_id]
+            self.finished &= spawns.keys()
+
+            for bullet_id, spawn in spawns.items():
+                if bullet_id in self.bullets or bullet_id in self.finished:
+                    continue
+                age = max(server_tick - spawn.spawn_tick, 0) / self.tick_rate
+                self.bullets[bullet_id] = SimulatedBullet(spawn, age, self.speed)
     
     def clear(self):
-        self.bullets.clear()
+        with self.lock:
+            self.bullets.clear()
+            self.finished.clear()
+
+    def update(self, dt):
+        collision_grid = GameClient.instance.collision_grid
+        with self.lock:
+            for bullet_id, bullet in list(self.bullets.items()):
+                bullet.position += bullet.direction * self.speed * dt
+                x, y = bullet.position
+                in_bounds = 0 <= x <= GameClient.instance.w and 0 <= y <= GameClient.instance.h
+                # The server will report the same end, stop drawing it right away.
+                if not in_bounds or (collision_grid is not None and collision_grid.is_solid(x, y)):
+                    del self.bullets[bullet_id]
+                    self.finished.add(bullet_id)
     
     def get_bullet_sprite(self, rot):
         rot = step(rot, 2 * math.pi / self.angle_count)
@@ -224,14 +158,15 @@ class Bullets:
         return self.bullet_sprites[rot]
 
     def draw(self, screen):
-        for bullet in self.bullets:
-            angle = math.atan2(-bullet.direction.y, bullet.direction.x)
-            sprite = self.get_bullet_sprite(angle)
-            screen.blit(sprite, sprite.get_rect(center=(bullet.position.x, bullet.position.y)))
+        with self.lock:
+            bullets = list(self.bullets.values())
+        for bullet in bullets:
+            sprite = self.get_bullet_sprite(bullet.angle)
+            screen.blit(sprite, sprite.get_rect(center=bullet.position))
 
 class GameClient:
     instance = None
-    def __init__(self, name):
+    def __init__(self, name, room_id='', interpolation_delay=INTERPOLATION_DELAY):
         GameClient.instance = self
         self.network_thread = None
         self.running = False
@@ -242,22 +177,45 @@ class GameClient:
         pg.display.set_caption("Game Client")
         self.clock = pg.time.Clock()
         self.client_id = name
-        self.font = pg.font.Font('assets/Tiny5-Regular.ttf', 14)
+        self.room_id = room_id
+        assets.preload()
 
         self.player = Player(pg.Vector2(0, 0), 0, self.client_id)
         self.player.position = pg.Vector2(self.w // 2, self.h // 2)
-        self.player.interpolate = False
         self.player.main_player = True
 
         self.debug_screen = DebugScreen(self.screen)
         self.debug_screen.set_value("FPS", 0)
         self.players = {}
+        # Remote players are drawn from here, a fixed delay behind the server clock.
+        self.remote_states = SnapshotBuffer(delay=interpolation_delay)
         logger.info(f"Game client initialized. Whale cum, {self.client_id}!")
         self.bullets = Bullets()
-        self.must_shoot = False
+        # Clicks since the last movement step, sent along with it.
+        self.pending_actions = []
+        # Inputs are predicted locally in fixed steps and kept until the server acknowledges them.
+        self.input_seq = 0
+        self.input_time = 0
+        self.pending_inputs = deque()
+        self.unsent_inputs = []
+        self.input_lock = threading.Lock()
+        self.correction = None
+        # (last input seq, send time) of every request with inputs, until the server acknowledges that seq.
+        self.in_flight = deque()
+        self.rtt = None
         self.map = None
-        self.text_map = None
-        self.debug_screen.set_value("Ping", "Disconnected")
+        self.map_hash = None
+        self.map_version = 0
+        self.collision_grid = None
+        self.snapshots = {}
+        self.acked_snapshot_id = 0
+        self.debug_screen.set_value("Snapshots", "Disconnected")
+        self.debug_screen.set_value("Sends", "Disconnected")
+        self.debug_screen.set_value("RTT", "-")
+        # These change every frame or snapshot, nobody can read them that fast anyway.
+        self.debug_screen.throttle("FPS", 0.5)
+        self.debug_screen.throttle("RTT", 0.25)
+        self.debug_screen.throttle("Interp buffer", 0.25)
 
     def run(self):
         self.running = True
@@ -279,7 +237,7 @@ class GameClient:
         channel = grpc.insecure_channel(HOST)
         try:
             stub = game_pb2_grpc.GameStub(channel)
-            request = game_pb2.JoinRequest(player_id=self.client_id)
+            request = game_pb2.JoinRequest(player_id=self.client_id, room_id=self.room_id)
             response = stub.Join(request)
         except grpc._channel._InactiveRpcError as e:
             logger.error("Failed to connect to server. Is it running?")
@@ -292,49 +250,173 @@ class GameClient:
             self.quit_main_loop()
             return
         else:
-            logger.success("Joined the game successfully!")
+            logger.success(f"Joined room {response.room_id} successfully!")
+            self.room_id = response.room_id
         
-        self.text_map = response.map.map
-        self.map = Map(response.map)
-        logger.info("Created map surface.")
+        self.bullets.speed = response.bullet_speed
+        self.bullets.tick_rate = response.tick_rate
+        self.remote_states.tick_rate = response.tick_rate
+        try:
+            self.change_map(stub, response.map_hash)
+        except (grpc.RpcError, ValueError) as e:
+            logger.error(f"Failed to load the map: {e}")
+            self.quit_main_loop()
+            return
 
         return channel, stub
 
+    def change_map(self, stub, map_hash, version=0):
+        map_data = fetch_map(stub, map_hash)
+        geometry = MapGeometry(map_data.text_map)
+        game_map = Map(geometry, map_data.colors)
+        collision_grid = geometry.collision_grid
+        if version < self.map_version:
+            # A newer change arrived while this one was loading, it swaps in its own map.
+            return
+        self.collision_grid = collision_grid
+        self.map = game_map
+        self.map_hash = map_hash
+        logger.info("Created map surface.")
+
+    def on_map_change(self, stub, map_change):
+        if map_change.version <= self.map_version:
+            return
+        self.map_version = map_change.version
+        if map_change.map_hash == self.map_hash:
+            return
+
+        def load():
+            try:
+                self.change_map(stub, map_change.map_hash, map_change.version)
+            except (grpc.RpcError, ValueError) as e:
+                logger.error(f"Failed to load map version {map_change.version}: {e}")
+
+        # Loaded next to the stream, so snapshots keep coming while a big map downloads.
+        threading.Thread(target=load, daemon=True).start()
+
     def network_loop(self):
         channel_stub = self.connect()
         if channel_stub is None:
             return
         channel, stub = channel_stub
-        last_time = time.time()
 
-        while self.running:
-            time.sleep(1 / 30)
-            position = game_pb2.Vec2(x=self.player.position.x, y=self.player.position.y)
-            request = game_pb2.UpdateRequest(client_id=self.client_id, position=position, direction=self.player.direction)
-            
-            last_time = time.time()
-            response = stub.Update(request)
-            current_time = time.time()
-            ping = round((current_time - last_time) * 1000)
-            last_time = current_time
-            self.debug_screen.set_value('Ping', f"{ping} ms")
-
-            player_states = response.states
-            self.bullets.bullets = response.bullets
-            self.process_player_states(player_states)
-
-            if self.must_shoot:
-                shoot_request = game_pb2.ShootRequest(player_id=self.client_id)
-                stub.Shoot(shoot_request)
-                self.must_shoot = False
-        
+        try:
+            self.play(stub)
+        except grpc.RpcError as e:
+            # Refused when the server has too many streams, or the server went away.
+            logger.error(f"Lost the game stream: {e.code()} {e.details()}")
+            self.quit_main_loop()
+            channel.close()
+            return
+        if self.running:
+            # The server ended the stream on its own, the player was kicked and is already out of the game.
+            logger.warning("Removed from the game by the server.")
+            self.quit_main_loop()
+            channel.close()
+            return
+
         request = game_pb2.LeaveRequest(player_id=self.client_id)
         response = stub.Leave(request)
         logger.info("Left the game.")  
         logger.info("Closing connection...")
         channel.close()
-    
-    def process_player_states(self, player_states):
+
+    def play(self, stub):
+        last_time = time.time()
+        snapshot_count = 0
+        for response in stub.Play(self.input_stream()):
+            snapshot_count += 1
+            current_time = time.time()
+            if current_time - last_time >= 1:
+                self.debug_screen.set_value('Snapshots', f"{snapshot_count / (current_time - last_time):.0f}/s")
+                snapshot_count = 0
+                last_time = current_time
+
+            if response.HasField('map_change'):
+                self.on_map_change(stub, response.map_change)
+
+            snapshot = self.apply_snapshot(response)
+            if snapshot is None:
+                continue
+            players, bullets = snapshot
+            self.bullets.sync(bullets, response.server_tick)
+            self.process_player_states(players.values(), response.server_tick)
+
+    def input_stream(self):
+        last_time = time.perf_counter()
+        send_count = skipped = 0
+        next_send = last_time
+        while self.running:
+            # Sends keep to a fixed schedule, whatever the round trip time is.
+            next_send += 1 / SEND_RATE
+            time.sleep(max(next_send - time.perf_counter(), 0))
+            current_time = time.perf_counter()
+            if current_time - next_send > 1 / SEND_RATE:
+                # Stalled for longer than a slot, start over instead of sending a burst.
+                next_send = current_time
+
+            with self.input_lock:
+                while self.in_flight and current_time - self.in_flight[0][1] > IN_FLIGHT_TIMEOUT:
+                    self.in_flight.popleft()
+                in_flight = len(self.in_flight)
+                if in_flight < MAX_IN_FLIGHT:
+                    inputs, self.unsent_inputs = self.unsent_inputs, []
+                    if inputs:
+                        self.in_flight.append((inputs[-1].seq, current_time))
+
+            if current_time - last_time >= 1:
+                self.debug_screen.set_value(
+                    'Sends', f"{send_count / (current_time - last_time):.0f}/s, {in_flight} in flight, {skipped} skipped"
+                )
+                send_count = skipped = 0
+                last_time = current_time
+
+            if in_flight >= MAX_IN_FLIGHT:
+                skipped += 1
+                continue
+            yield game_pb2.UpdateRequest(
+                client_id=self.client_id, direction=self.player.direction,
+                ack_snapshot_id=self.acked_snapshot_id, inputs=inputs
+            )
+            send_count += 1
+
+    def acknowledge_inputs(self, last_input_seq):
+        current_time = time.perf_counter()
+        with self.input_lock:
+            while self.in_flight and self.in_flight[0][0] <= last_input_seq:
+                _, sent = self.in_flight.popleft()
+                # Send to acknowledgement, so it includes the wait for the server's next tick and snapshot.
+                rtt = current_time - sent
+                self.rtt = rtt if self.rtt is None else self.rtt + (rtt - self.rtt) * 0.1
+        if self.rtt is not None:
+            self.debug_screen.set_value("RTT", f"{self.rtt * 1000:.0f} ms")
+
+    def apply_snapshot(self, response):
+        if response.baseline_id == 0:
+            players, bullets = {}, {}
+        elif response.baseline_id in self.snapshots:
+            base_players, base_bullets = self.snapshots[response.baseline_id]
+            players, bullets = dict(base_players), dict(base_bullets)
+        else:
+            # Baseline already forgotten, keep acking the last snapshot we decoded.
+            return None
+
+        for state in response.states:
+            players[state.client_id] = state
+        for bullet in response.bullets:
+            bullets[bullet.bullet_id] = bullet
+        for client_id in response.removed_players:
+            players.pop(client_id, None)
+        for bullet_end in response.bullet_ends:
+            bullets.pop(bullet_end.bullet_id, None)
+
+        self.snapshots[response.snapshot_id] = (players, bullets)
+        for snapshot_id in [i for i in self.snapshots if i <= response.snapshot_id - SNAPSHOT_HISTORY]:
+            del self.snapshots[snapshot_id]
+        self.acked_snapshot_id = max(self.acked_snapshot_id, response.snapshot_id)
+        return players, bullets
+
+    def process_player_states(self, player_states, server_tick):
         current_ids = set(self.players.keys())
         incoming_ids = set(state.client_id for state in player_states if state.client_id != self.client_id)
 
@@ -344,14 +426,18 @@ class GameClient:
         for state in player_states:
             if state.client_id == self.client_id:
                 self.player.hp = state.hp
+                # Applied on the main thread, which owns the predicted position.
+                self.correction = state
+                self.acknowledge_inputs(state.last_input_seq)
                 continue
              
             if state.client_id not in self.players:
                 self.players[state.client_id] = Player(pg.Vector2(state.position.x, state.position.y), state.direction, state.client_id)
-            else:
-                player = self.players[state.client_id]
-                player.update_pos_and_dir(pg.Vector2(state.position.x, state.position.y), state.direction)
-                player.hp = state.hp
+            self.players[state.client_id].hp = state.hp
+        self.remote_states.push(server_tick, {
+            state.client_id: (state.position.x, state.position.y, state.direction)
+            for state in player_states if state.client_id != self.client_id
+        })
 
     def draw_players(self):
         for player in self.players.values():
@@ -371,11 +457,15 @@ class GameClient:
                 self.quit_main_loop()
             if event.type == pg.MOUSEBUTTONDOWN:
                 if event.button == 1 and not self.player.dead():
-                    self.must_shoot = True
+                    self.pending_actions.append(game_pb2.Action(type=game_pb2.SHOOT))
 
     def update(self):
         self.dt = self.clock.tick() / 1000
         self.player.update(self.dt)
+        self.reconcile()
+        self.predict(self.dt)
+        self.update_remote_players()
+        self.bullets.update(self.dt)
 
         try:
             self.debug_screen.set_value("FPS", int(self.clock.get_fps()))
@@ -386,6 +476,47 @@ class GameClient:
         # self.debug_screen.set_value("Direction", f"{math.degrees(self.player.direction):.2f}°")
         self.debug_screen.set_value("HP", self.player.hp)
     
+    def update_remote_players(self):
+        for client_id, (x, y, direction) in self.remote_states.sample().items():
+            player = self.players.get(client_id)
+            if player is not None:
+                player.position = pg.Vector2(x, y)
+                player.direction = direction
+        depth, buffered = self.remote_states.depth()
+        extrapolating = " extrapolating" if self.remote_states.extrapolating else ""
+        self.debug_screen.set_value("Interp buffer", f"{depth} ({buffered * 1000:.0f} ms){extrapolating}")
+
+    def predict(self, dt):
+        if self.collision_grid is None:
+            return
+        self.input_time += dt
+        while self.input_time >= INPUT_STEP:
+            self.input_time -= INPUT_STEP
+            self.input_seq += 1
+            move_x, move_y = self.player.read_movement()
+            move = game_pb2.MoveInput(
+                seq=self.input_seq, move_x=move_x, move_y=move_y, direction=self.player.direction,
+                actions=self.pending_actions, view_tick=self.remote_states.view_tick()
+            )
+            self.pending_actions = []
+            self.player.move(move_x, move_y)
+            self.pending_inputs.append(move)
+            if len(self.pending_inputs) > MAX_PENDING_INPUTS:
+                self.pending_inputs.popleft()
+            with self.input_lock:
+                self.unsent_inputs.append(move)
+
+    def reconcile(self):
+        state, self.correction = self.correction, None
+        if state is None:
+            return
+        # Start over from where the server put us and replay what it hasn't seen yet.
+        while self.pending_inputs and self.pending_inputs[0].seq <= state.last_input_seq:
+            self.pending_inputs.popleft()
+        self.player.position = pg.Vector2(state.position.x, state.position.y)
+        for move in self.pending_inputs:
+            self.player.move(move.move_x, move.move_y)
+
     def render(self):
         self.screen.fill((0, 0, 0))
         if self.map is not None:
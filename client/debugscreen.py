@@ -1,24 +1,64 @@
 import pygame as pg
+import time
+from client.assets import assets, DEBUG_FONT_SIZE
 
 
 class Box:
-    def __init__(self, value):
+    def __init__(self, value, interval=0):
         self.value = value
-    
+        # What is on screen right now, re-rendered only when value differs from it.
+        self.shown = None
+        self.surface = None
+        self.rendered_at = 0
+        self.interval = interval
+
 
 class DebugScreen:
     def __init__(self, screen):
         self.values = {}
-        self.font = pg.font.Font('assets/Tiny5-Regular.ttf', 20)
+        # Throttled names may have no value yet, their box gets the interval once one is set.
+        self.intervals = {}
+        self.font = assets.font(DEBUG_FONT_SIZE)
         self.screen = screen
+        self.line_height = self.font.get_height() + 5
+        # Every entry composited into one surface, rebuilt only when a line changes.
+        self.overlay = None
 
     def set_value(self, name, value):
         if name not in self.values:
-            self.values[name] = Box(value)
+            self.values[name] = Box(value, self.intervals.get(name, 0))
         else:
             self.values[name].value = value
-    
+
+    def throttle(self, name, interval):
+        # Values that change every frame are shown at most once per `interval` seconds.
+        self.intervals[name] = interval
+        if name in self.values:
+            self.values[name].interval = interval
+
+    def update(self):
+        now = time.perf_counter()
+        changed = False
+        # Copied, the network thread can add entries while the main thread draws.
+        boxes = list(self.values.items())
+        for name, box in boxes:
+            value = box.value
+            if box.surface is not None and (value == box.shown or now - box.rendered_at < box.interval):
+                continue
+            box.surface = self.font.render(f"{name}: {value}", False, (255, 255, 255))
+            box.shown = value
+            box.rendered_at = now
+            changed = True
+
+        if not changed and self.overlay is not None and self.overlay.get_height() == len(boxes) * self.line_height:
+            return
+        width = max((box.surface.get_width() for _, box in boxes), default=0)
+        # Text is white on black and black is keyed out, a colorkey blit is much cheaper than alpha blending.
+        self.overlay = pg.Surface((width, len(boxes) * self.line_height))
+        for i, (_, box) in enumerate(boxes):
+            self.overlay.blit(box.surface, (0, i * self.line_height))
+        self.overlay.set_colorkey((0, 0, 0), pg.RLEACCEL)
+
     def draw(self):
-        for i, (name, box) in enumerate(self.values.items()):
-            text = self.font.render(f"{name}: {box.value}", False, (255, 255, 255))
-            self.screen.blit(text, (10, 10 + i * (self.font.get_height() + 5)))
+        self.update()
+        self.screen.blit(self.overlay, (10, 10))
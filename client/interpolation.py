@@ -0,0 +1,103 @@
+import math
+import threading
+import time
+from collections import deque
+
+
+# Remote players are drawn this far in the past, so there is usually a newer snapshot to move towards.
+INTERPOLATION_DELAY = 0.1
+# How long to keep moving players along their last velocity when snapshots stop arriving.
+MAX_EXTRAPOLATION = 0.1
+MAX_BUFFERED = 64
+# How fast the server clock estimate follows snapshots that arrive late; early ones are taken right away.
+CLOCK_DRIFT = 0.05
+
+
+def lerp_angle(a, b, t):
+    return a + ((b - a + math.pi) % (2 * math.pi) - math.pi) * t
+
+
+class SnapshotBuffer:
+    # Remote player states by server tick, sampled on the main thread at a fixed delay behind the server.
+    def __init__(self, tick_rate=60, delay=INTERPOLATION_DELAY):
+        self.tick_rate = tick_rate
+        self.delay = delay
+        self.snapshots = deque()
+        self.lock = threading.Lock()
+        # Local time minus server time, the smallest recent value is the one with the least network delay in it.
+        self.clock_offset = None
+        self.extrapolating = False
+
+    def push(self, server_tick, states, now=None):
+        now = time.perf_counter() if now is None else now
+        sample = now - server_tick / self.tick_rate
+        with self.lock:
+            if self.snapshots and server_tick <= self.snapshots[-1][0]:
+                return
+            if self.clock_offset is None or sample < self.clock_offset:
+                self.clock_offset = sample
+            else:
+                self.clock_offset += (sample - self.clock_offset) * CLOCK_DRIFT
+            self.snapshots.append((server_tick, states))
+            if len(self.snapshots) > MAX_BUFFERED:
+                self.snapshots.popleft()
+
+    def clear(self):
+        with self.lock:
+            self.snapshots.clear()
+            self.clock_offset = None
+
+    def render_tick(self, now):
+        return (now - self.clock_offset - self.delay) * self.tick_rate
+
+    def view_tick(self, now=None):
+        # Server tick remote players are drawn at, 0 until the clock is known.
+        now = time.perf_counter() if now is None else now
+        with self.lock:
+            if self.clock_offset is None:
+                return 0
+            return max(round(self.render_tick(now)), 0)
+
+    def sample(self, now=None):
+        # Returns client_id -> (x, y, direction) at the render time.
+        now = time.perf_counter() if now is None else now
+        with self.lock:
+            if not self.snapshots:
+                return {}
+            render_tick = self.render_tick(now)
+            # The oldest snapshot still needed is the last one at or before the render time.
+            # Two are always kept, they give the velocity to extrapolate with.
+            while len(self.snapshots) > 2 and self.snapshots[1][0] <= render_tick:
+                self.snapshots.popleft()
+            snapshots = list(self.snapshots)
+
+        if len(snapshots) == 1:
+            self.extrapolating = False
+            return dict(snapshots[0][1])
+
+        (tick_a, states_a), (tick_b, states_b) = snapshots[0], snapshots[1]
+        self.extrapolating = render_tick > snapshots[-1][0]
+        if self.extrapolating:
+            # Both snapshots are in the past: keep the last velocity going for a little while.
+            limit = tick_b + MAX_EXTRAPOLATION * self.tick_rate
+            render_tick = min(render_tick, limit)
+        t = max(render_tick - tick_a, 0) / (tick_b - tick_a)
+
+        result = {}
+        for client_id, (x_b, y_b, direction_b) in states_b.items():
+            if client_id not in states_a:
+                result[client_id] = x_b, y_b, direction_b
+                continue
+            x_a, y_a, direction_a = states_a[client_id]
+            result[client_id] = x_a + (x_b - x_a) * t, y_a + (y_b - y_a) * t, lerp_angle(direction_a, direction_b, t)
+        return result
+
+    def depth(self, now=None):
+        # Snapshots buffered ahead of the render time, and how much time they cover.
+        now = time.perf_counter() if now is None else now
+        with self.lock:
+            if not self.snapshots:
+                return 0, 0
+            render_tick = self.render_tick(now)
+            ahead = sum(1 for tick, _ in self.snapshots if tick > render_tick)
+            return ahead, max(self.snapshots[-1][0] - render_tick, 0) / self.tick_rate
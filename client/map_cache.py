@@ -0,0 +1,55 @@
+from loguru import logger
+import os
+import game_pb2
+from map_format import MapData, content_hash
+
+
+# Maps are immutable once hashed, so a cached file never has to be revalidated against the server.
+MAP_CACHE_DIR = os.path.join('cache', 'maps')
+
+
+def cache_path(map_hash):
+    return os.path.join(MAP_CACHE_DIR, f"{map_hash}.map")
+
+
+def read_cached(map_hash):
+    try:
+        with open(cache_path(map_hash), 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    if content_hash(data) != map_hash:
+        logger.warning(f"Cached map {map_hash[:12]} is corrupt, downloading it again.")
+        return None
+    return data
+
+
+def write_cached(map_hash, data):
+    os.makedirs(MAP_CACHE_DIR, exist_ok=True)
+    path = cache_path(map_hash)
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, 'wb') as f:
+        f.write(data)
+    os.replace(temporary_path, path)
+
+
+def download(stub, map_hash):
+    data = bytearray()
+    for chunk in stub.GetMap(game_pb2.GetMapRequest(map_hash=map_hash)):
+        data += chunk.data
+    data = bytes(data)
+    if content_hash(data) != map_hash:
+        raise ValueError(f"Downloaded map does not match hash {map_hash}")
+    return data
+
+
+def fetch_map(stub, map_hash):
+    data = read_cached(map_hash)
+    if data is not None:
+        logger.info(f"Loaded map {map_hash[:12]} from cache.")
+        return MapData.from_packed(data)
+
+    data = download(stub, map_hash)
+    write_cached(map_hash, data)
+    logger.info(f"Downloaded map {map_hash[:12]} ({len(data)} bytes).")
+    return MapData.from_packed(data)
@@ -0,0 +1,121 @@
+import math
+
+
+def collision_direction(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+
+    dx = (bx + bw / 2) - (ax + aw / 2)
+    dy = (by + bh / 2) - (ay + ah / 2)
+
+    overlap_x = (aw + bw) / 2 - abs(dx)
+    overlap_y = (ah + bh) / 2 - abs(dy)
+
+    if overlap_x < overlap_y:
+        return "left" if dx > 0 else "right"
+    return "up" if dy > 0 else "down"
+
+
+class CollisionGrid:
+    def __init__(self, text_map, pixels_per_block, origin):
+        self.width = max(map(len, text_map), default=0)
+        self.height = len(text_map)
+        self.pixels_per_block = pixels_per_block
+        self.origin = origin
+        self.solid = bytearray(self.width * self.height)
+
+        for y, row in enumerate(text_map):
+            for x, cell in enumerate(row):
+                if cell != ' ':
+                    self.solid[y * self.width + x] = 1
+
+    def cell_at(self, x, y):
+        return (
+            math.floor((x - self.origin[0]) / self.pixels_per_block),
+            math.floor((y - self.origin[1]) / self.pixels_per_block)
+        )
+
+    def cell_rect(self, cell_x, cell_y):
+        ppb = self.pixels_per_block
+        return (cell_x * ppb + self.origin[0], cell_y * ppb + self.origin[1], ppb, ppb)
+
+    def solid_cell(self, cell_x, cell_y):
+        if not (0 <= cell_x < self.width and 0 <= cell_y < self.height):
+            return False
+        return self.solid[cell_y * self.width + cell_x] == 1
+
+    def is_solid(self, x, y):
+        return self.solid_cell(*self.cell_at(x, y))
+
+    def overlapping_cells(self, box):
+        # Only the cells under the box are visited; edges that merely touch don't count.
+        left, top, w, h = box
+        ppb = self.pixels_per_block
+        first_x, first_y = self.cell_at(left, top)
+        last_x = math.ceil((left + w - self.origin[0]) / ppb) - 1
+        last_y = math.ceil((top + h - self.origin[1]) / ppb) - 1
+
+        for cell_y in range(max(first_y, 0), min(last_y, self.height - 1) + 1):
+            for cell_x in range(max(first_x, 0), min(last_x, self.width - 1) + 1):
+                if self.solid[cell_y * self.width + cell_x]:
+                    yield cell_x, cell_y
+
+    def collide_box(self, box):
+        for cell in self.overlapping_cells(box):
+            return True, collision_direction(self.cell_rect(*cell), box)
+        return False, None
+
+    def move_box(self, x, y, new_x, new_y, half_size):
+        size = half_size * 2
+        collides, direction = self.collide_box((new_x - half_size, new_y - half_size, size, size))
+        if not collides:
+            return new_x, new_y
+
+        # Drop the blocked axis and keep the other one so the box slides along the wall.
+        if direction in ("left", "right"):
+            candidates = ((x, new_y), (new_x, y))
+        else:
+            candidates = ((new_x, y), (x, new_y))
+
+        for candidate_x, candidate_y in candidates:
+            if (candidate_x, candidate_y) == (x, y):
+                continue
+            box = (candidate_x - half_size, candidate_y - half_size, size, size)
+            if not self.collide_box(box)[0]:
+                return candidate_x, candidate_y
+
+        return x, y
+
+    def raycast(self, x0, y0, x1, y1):
+        # Walks the cells the segment crosses (DDA) and returns the fraction of the segment
+        # at which it first enters a solid cell, or None if it stays clear.
+        cell_x, cell_y = self.cell_at(x0, y0)
+        end_x, end_y = self.cell_at(x1, y1)
+        if self.solid_cell(cell_x, cell_y):
+            return 0.0
+
+        ppb = self.pixels_per_block
+        dx, dy = x1 - x0, y1 - y0
+        step_x = 1 if dx > 0 else -1
+        step_y = 1 if dy > 0 else -1
+        t_delta_x = ppb / abs(dx) if dx else math.inf
+        t_delta_y = ppb / abs(dy) if dy else math.inf
+        boundary_x = self.origin[0] + (cell_x + (dx > 0)) * ppb
+        boundary_y = self.origin[1] + (cell_y + (dy > 0)) * ppb
+        t_max_x = (boundary_x - x0) / dx if dx else math.inf
+        t_max_y = (boundary_y - y0) / dy if dy else math.inf
+
+        while (cell_x, cell_y) != (end_x, end_y):
+            if t_max_x < t_max_y:
+                t = t_max_x
+                cell_x += step_x
+                t_max_x += t_delta_x
+            else:
+                t = t_max_y
+                cell_y += step_y
+                t_max_y += t_delta_y
+            if t > 1:
+                break
+            if self.solid_cell(cell_x, cell_y):
+                return t
+        return None
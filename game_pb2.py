@@ -24,43 +24,57 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\ngame.proto\" \n\x0bJoinRequest\x12\x11\n\tplayer_id\x18\x01 \x01(\t\"C\n\x0cJoinResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\x12\x11\n\x03map\x18\x03 \x01(\x0b\x32\x04.Map\"!\n\x0cLeaveRequest\x12\x11\n\tplayer_id\x18\x01 \x01(\t\"1\n\rLeaveResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\"N\n\rUpdateRequest\x12\x11\n\tclient_id\x18\x01 \x01(\t\x12\x17\n\x08position\x18\x02 \x01(\x0b\x32\x05.Vec2\x12\x11\n\tdirection\x18\x03 \x01(\x02\"\x1c\n\x04Vec2\x12\t\n\x01x\x18\x01 \x01(\x02\x12\t\n\x01y\x18\x02 \x01(\x02\"X\n\x0bPlayerState\x12\x11\n\tclient_id\x18\x01 \x01(\t\x12\x17\n\x08position\x18\x02 \x01(\x0b\x32\x05.Vec2\x12\x11\n\tdirection\x18\x03 \x01(\x02\x12\n\n\x02hp\x18\x04 \x01(\x05\"`\n\x06\x42ullet\x12\x10\n\x08owner_id\x18\x01 \x01(\t\x12\x11\n\tbullet_id\x18\x02 \x01(\x05\x12\x17\n\x08position\x18\x03 \x01(\x0b\x32\x05.Vec2\x12\x18\n\tdirection\x18\x04 \x01(\x0b\x32\x05.Vec2\"H\n\x0eUpdateResponse\x12\x1c\n\x06states\x18\x01 \x03(\x0b\x32\x0c.PlayerState\x12\x18\n\x07\x62ullets\x18\x02 \x03(\x0b\x32\x07.Bullet\"!\n\x0cShootRequest\x12\x11\n\tplayer_id\x18\x01 \x01(\t\" \n\rShootResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\"(\n\x05\x43olor\x12\t\n\x01r\x18\x01 \x01(\r\x12\t\n\x01g\x18\x02 \x01(\r\x12\t\n\x01\x62\x18\x03 \x01(\r\":\n\rColorMapEntry\x12\x15\n\x05\x63olor\x18\x01 \x01(\x0b\x32\x06.Color\x12\x12\n\nidentifier\x18\x02 \x01(\t\"5\n\x03Map\x12!\n\tcolor_map\x18\x01 \x03(\x0b\x32\x0e.ColorMapEntry\x12\x0b\n\x03map\x18\x02 \x03(\t\"\x0f\n\rGetMapRequest2\xc6\x01\n\x04Game\x12#\n\x04Join\x12\x0c.JoinRequest\x1a\r.JoinResponse\x12&\n\x05Leave\x12\r.LeaveRequest\x1a\x0e.LeaveResponse\x12)\n\x06Update\x12\x0e.UpdateRequest\x1a\x0f.UpdateResponse\x12&\n\x05Shoot\x12\r.ShootRequest\x1a\x0e.ShootResponse\x12\x1e\n\x06GetMap\x12\x0e.GetMapRequest\x1a\x04.Mapb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\ngame.proto\"1\n\x0bJoinRequest\x12\x11\n\tplayer_id\x18\x01 \x01(\t\x12\x0f\n\x07room_id\x18\x02 \x01(\t\"\x8f\x01\n\x0cJoinResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\x12\x11\n\x03map\x18\x03 \x01(\x0b\x32\x04.Map\x12\x11\n\ttick_rate\x18\x04 \x01(\r\x12\x14\n\x0c\x62ullet_speed\x18\x05 \x01(\x02\x12\x0f\n\x07room_id\x18\x06 \x01(\t\x12\x10\n\x08map_hash\x18\x07 \x01(\t\"!\n\x0cLeaveRequest\x12\x11\n\tplayer_id\x18\x01 \x01(\t\"1\n\rLeaveResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\"\x83\x01\n\rUpdateRequest\x12\x11\n\tclient_id\x18\x01 \x01(\t\x12\x17\n\x08position\x18\x02 \x01(\x0b\x32\x05.Vec2\x12\x11\n\tdirection\x18\x03 \x01(\x02\x12\x17\n\x0f\x61\x63k_snapshot_id\x18\x04 \x01(\r\x12\x1a\n\x06inputs\x18\x05 \x03(\x0b\x32\n.MoveInput\"x\n\tMoveInput\x12\x0b\n\x03seq\x18\x01 \x01(\r\x12\x0e\n\x06move_x\x18\x02 \x01(\x11\x12\x0e\n\x06move_y\x18\x03 \x01(\x11\x12\x11\n\tdirection\x18\x04 \x01(\x02\x12\x18\n\x07\x61\x63tions\x18\x05 \x03(\x0b\x32\x07.Action\x12\x11\n\tview_tick\x18\x06 \x01(\r\"#\n\x06\x41\x63tion\x12\x19\n\x04type\x18\x01 \x01(\x0e\x32\x0b.ActionType\"\x1c\n\x04Vec2\x12\t\n\x01x\x18\x01 \x01(\x02\x12\t\n\x01y\x18\x02 \x01(\x02\"p\n\x0bPlayerState\x12\x11\n\tclient_id\x18\x01 \x01(\t\x12\x17\n\x08position\x18\x02 \x01(\x0b\x32\x05.Vec2\x12\x11\n\tdirection\x18\x03 \x01(\x02\x12\n\n\x02hp\x18\x04 \x01(\x05\x12\x16\n\x0elast_input_seq\x18\x05 \x01(\r\"t\n\x06\x42ullet\x12\x10\n\x08owner_id\x18\x01 \x01(\t\x12\x11\n\tbullet_id\x18\x02 \x01(\x05\x12\x17\n\x08position\x18\x03 \x01(\x0b\x32\x05.Vec2\x12\x18\n\tdirection\x18\x04 \x01(\x0b\x32\x05.Vec2\x12\x12\n\nspawn_tick\x18\x05 \x01(\r\"{\n\tBulletEnd\x12\x11\n\tbullet_id\x18\x01 \x01(\x05\x12 \n\x06reason\x18\x02 \x01(\x0e\x32\x10.BulletEndReason\x12\x17\n\x08position\x18\x03 \x01(\x0b\x32\x05.Vec2\x12\x12\n\nhit_player\x18\x04 \x01(\t\x12\x0c\n\x04tick\x18\x05 \x01(\r\"\xed\x01\n\x0eUpdateResponse\x12\x1c\n\x06states\x18\x01 \x03(\x0b\x32\x0c.PlayerState\x12\x18\n\x07\x62ullets\x18\x02 \x03(\x0b\x32\x07.Bullet\x12\x13\n\x0bsnapshot_id\x18\x03 \x01(\r\x12\x13\n\x0b\x62\x61seline_id\x18\x04 \x01(\r\x12\x17\n\x0fremoved_players\x18\x05 \x03(\t\x12\x13\n\x0bserver_tick\x18\x07 \x01(\r\x12\x1f\n\x0b\x62ullet_ends\x18\x08 \x03(\x0b\x32\n.BulletEnd\x12\x1e\n\nmap_change\x18\n \x01(\x0b\x32\n.MapChangeJ\x04\x08\x06\x10\x07J\x04\x08\t\x10\n\".\n\tMapChange\x12\x0f\n\x07version\x18\x01 \x01(\r\x12\x10\n\x08map_hash\x18\x02 \x01(\t\"!\n\x0cShootRequest\x12\x11\n\tplayer_id\x18\x01 \x01(\t\" \n\rShootResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\"(\n\x05\x43olor\x12\t\n\x01r\x18\x01 \x01(\r\x12\t\n\x01g\x18\x02 \x01(\r\x12\t\n\x01\x62\x18\x03 \x01(\r\":\n\rColorMapEntry\x12\x15\n\x05\x63olor\x18\x01 \x01(\x0b\x32\x06.Color\x12\x12\n\nidentifier\x18\x02 \x01(\t\"5\n\x03Map\x12!\n\tcolor_map\x18\x01 \x03(\x0b\x32\x0e.ColorMapEntry\x12\x0b\n\x03map\x18\x02 \x03(\t\"!\n\rGetMapRequest\x12\x10\n\x08map_hash\x18\x01 \x01(\t\",\n\x08MapChunk\x12\x12\n\ntotal_size\x18\x01 \x01(\r\x12\x0c\n\x04\x64\x61ta\x18\x02 \x01(\x0c*&\n\nActionType\x12\r\n\tNO_ACTION\x10\x00\x12\t\n\x05SHOOT\x10\x01*D\n\x0f\x42ulletEndReason\x12\x0b\n\x07REMOVED\x10\x00\x12\x08\n\x04WALL\x10\x01\x12\x11\n\rOUT_OF_BOUNDS\x10\x02\x12\x07\n\x03HIT\x10\x03\x32\xfa\x01\n\x04Game\x12#\n\x04Join\x12\x0c.JoinRequest\x1a\r.JoinResponse\x12&\n\x05Leave\x12\r.LeaveRequest\x1a\x0e.LeaveResponse\x12)\n\x06Update\x12\x0e.UpdateRequest\x1a\x0f.UpdateResponse\x12&\n\x05Shoot\x12\r.ShootRequest\x1a\x0e.ShootResponse\x12%\n\x06GetMap\x12\x0e.GetMapRequest\x1a\t.MapChunk0\x01\x12+\n\x04Play\x12\x0e.UpdateRequest\x1a\x0f.UpdateResponse(\x01\x30\x01\x62\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
 _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'game_pb2', _globals)
 if not _descriptor._USE_C_DESCRIPTORS:
   DESCRIPTOR._loaded_options = None
+  _globals['_ACTIONTYPE']._serialized_start=1572
+  _globals['_ACTIONTYPE']._serialized_end=1610
+  _globals['_BULLETENDREASON']._serialized_start=1612
+  _globals['_BULLETENDREASON']._serialized_end=1680
   _globals['_JOINREQUEST']._serialized_start=14
-  _globals['_JOINREQUEST']._serialized_end=46
-  _globals['_JOINRESPONSE']._serialized_start=48
-  _globals['_JOINRESPONSE']._serialized_end=115
-  _globals['_LEAVEREQUEST']._serialized_start=117
-  _globals['_LEAVEREQUEST']._serialized_end=150
-  _globals['_LEAVERESPONSE']._serialized_start=152
-  _globals['_LEAVERESPONSE']._serialized_end=201
-  _globals['_UPDATEREQUEST']._serialized_start=203
-  _globals['_UPDATEREQUEST']._serialized_end=281
-  _globals['_VEC2']._serialized_start=283
-  _globals['_VEC2']._serialized_end=311
-  _globals['_PLAYERSTATE']._serialized_start=313
-  _globals['_PLAYERSTATE']._serialized_end=401
-  _globals['_BULLET']._serialized_start=403
-  _globals['_BULLET']._serialized_end=499
-  _globals['_UPDATERESPONSE']._serialized_start=501
-  _globals['_UPDATERESPONSE']._serialized_end=573
-  _globals['_SHOOTREQUEST']._serialized_start=575
-  _globals['_SHOOTREQUEST']._serialized_end=608
-  _globals['_SHOOTRESPONSE']._serialized_start=610
-  _globals['_SHOOTRESPONSE']._serialized_end=642
-  _globals['_COLOR']._serialized_start=644
-  _globals['_COLOR']._serialized_end=684
-  _globals['_COLORMAPENTRY']._serialized_start=686
-  _globals['_COLORMAPENTRY']._serialized_end=744
-  _globals['_MAP']._serialized_start=746
-  _globals['_MAP']._serialized_end=799
-  _globals['_GETMAPREQUEST']._serialized_start=801
-  _globals['_GETMAPREQUEST']._serialized_end=816
-  _globals['_GAME']._serialized_start=819
-  _globals['_GAME']._serialized_end=1017
+  _globals['_JOINREQUEST']._serialized_end=63
+  _globals['_JOINRESPONSE']._serialized_start=66
+  _globals['_JOINRESPONSE']._serialized_end=209
+  _globals['_LEAVEREQUEST']._serialized_start=211
+  _globals['_LEAVEREQUEST']._serialized_end=244
+  _globals['_LEAVERESPONSE']._serialized_start=246
+  _globals['_LEAVERESPONSE']._serialized_end=295
+  _globals['_UPDATEREQUEST']._serialized_start=298
+  _globals['_UPDATEREQUEST']._serialized_end=429
+  _globals['_MOVEINPUT']._serialized_start=431
+  _globals['_MOVEINPUT']._serialized_end=551
+  _globals['_ACTION']._serialized_start=553
+  _globals['_ACTION']._serialized_end=588
+  _globals['_VEC2']._serialized_start=590
+  _globals['_VEC2']._serialized_end=618
+  _globals['_PLAYERSTATE']._serialized_start=620
+  _globals['_PLAYERSTATE']._serialized_end=732
+  _globals['_BULLET']._serialized_start=734
+  _globals['_BULLET']._serialized_end=850
+  _globals['_BULLETEND']._serialized_start=852
+  _globals['_BULLETEND']._serialized_end=975
+  _globals['_UPDATERESPONSE']._serialized_start=978
+  _globals['_UPDATERESPONSE']._serialized_end=1215
+  _globals['_MAPCHANGE']._serialized_start=1217
+  _globals['_MAPCHANGE']._serialized_end=1263
+  _globals['_SHOOTREQUEST']._serialized_start=1265
+  _globals['_SHOOTREQUEST']._serialized_end=1298
+  _globals['_SHOOTRESPONSE']._serialized_start=1300
+  _globals['_SHOOTRESPONSE']._serialized_end=1332
+  _globals['_COLOR']._serialized_start=1334
+  _globals['_COLOR']._serialized_end=1374
+  _globals['_COLORMAPENTRY']._serialized_start=1376
+  _globals['_COLORMAPENTRY']._serialized_end=1434
+  _globals['_MAP']._serialized_start=1436
+  _globals['_MAP']._serialized_end=1489
+  _globals['_GETMAPREQUEST']._serialized_start=1491
+  _globals['_GETMAPREQUEST']._serialized_end=1524
+  _globals['_MAPCHUNK']._serialized_start=1526
+  _globals['_MAPCHUNK']._serialized_end=1570
+  _globals['_GAME']._serialized_start=1683
+  _globals['_GAME']._serialized_end=1933
 # @@protoc_insertion_point(module_scope)
@@ -54,10 +54,15 @@ class GameStub(object):
                 request_serializer=game__pb2.ShootRequest.SerializeToString,
                 response_deserializer=game__pb2.ShootResponse.FromString,
                 _registered_method=True)
-        self.GetMap = channel.unary_unary(
+        self.GetMap = channel.unary_stream(
                 '/Game/GetMap',
                 request_serializer=game__pb2.GetMapRequest.SerializeToString,
-                response_deserializer=game__pb2.Map.FromString,
+                response_deserializer=game__pb2.MapChunk.FromString,
+                _registered_method=True)
+        self.Play = channel.stream_stream(
+                '/Game/Play',
+                request_serializer=game__pb2.UpdateRequest.SerializeToString,
+                response_deserializer=game__pb2.UpdateResponse.FromString,
                 _registered_method=True)
 
 
@@ -83,7 +88,8 @@ class GameServicer(object):
         raise NotImplementedError('Method not implemented!')
 
     def Shoot(self, request, context):
-        """Missing associated documentation comment in .proto file."""
+        """Kept for older clients, current ones send shots as actions inside their inputs.
+        """
         context.set_code(grpc.StatusCode.UNIMPLEMENTED)
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
@@ -94,6 +100,12 @@ class GameServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def Play(self, request_iterator, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_GameServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -117,10 +129,15 @@ def add_GameServicer_to_server(servicer, server):
                     request_deserializer=game__pb2.ShootRequest.FromString,
                     response_serializer=game__pb2.ShootResponse.SerializeToString,
             ),
-            'GetMap': grpc.unary_unary_rpc_method_handler(
+            'GetMap': grpc.unary_stream_rpc_method_handler(
                     servicer.GetMap,
                     request_deserializer=game__pb2.GetMapRequest.FromString,
-                    response_serializer=game__pb2.Map.SerializeToString,
+                    response_serializer=game__pb2.MapChunk.SerializeToString,
+            ),
+            'Play': grpc.stream_stream_rpc_method_handler(
+                    servicer.Play,
+                    request_deserializer=game__pb2.UpdateRequest.FromString,
+                    response_serializer=game__pb2.UpdateResponse.SerializeToString,
             ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
@@ -252,12 +269,39 @@ class Game(object):
             wait_for_ready=None,
             timeout=None,
             metadata=None):
-        return grpc.experimental.unary_unary(
+        return grpc.experimental.unary_stream(
             request,
             target,
             '/Game/GetMap',
             game__pb2.GetMapRequest.SerializeToString,
-            game__pb2.Map.FromString,
+            game__pb2.MapChunk.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def Play(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_stream(
+            request_iterator,
+            target,
+            '/Game/Play',
+            game__pb2.UpdateRequest.SerializeToString,
+            game__pb2.UpdateResponse.FromString,
             options,
             channel_credentials,
             insecure,
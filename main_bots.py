@@ -0,0 +1,15 @@
+from bots.swarm import run_swarm, HOST
+import argparse
+import asyncio
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--host', default=HOST)
+parser.add_argument('--bots', type=int, default=100)
+parser.add_argument('--duration', type=float, default=30, help="seconds every bot stays in the game")
+parser.add_argument('--room', default='', help="room to join, empty lets the server matchmake")
+parser.add_argument('--shoot-interval', type=float, default=0.5, help="average seconds between shots per bot")
+parser.add_argument('--report-interval', type=float, default=5)
+args = parser.parse_args()
+
+asyncio.run(run_swarm(args.host, args.bots, args.duration, args.room, args.shoot_interval, args.report_interval))
\ No newline at end of file
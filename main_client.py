@@ -2,4 +2,4 @@ from client.client import GameClient
 import sys 
 
 
-GameClient(name=sys.argv[1]).run()
\ No newline at end of file
+GameClient(name=sys.argv[1], room_id=sys.argv[2] if len(sys.argv) > 2 else '').run()
\ No newline at end of file
@@ -1,4 +1,23 @@
-from server.server import serve
+from server.server import serve, PORT, MAX_STREAMS
+from server.aio_server import serve as serve_aio
+from server.simulation import TICK_RATE
+from server.rooms import WORKERS
+from server.metrics import METRICS_PORT
+import argparse
 
 
-serve()
\ No newline at end of file
+# Room workers are spawned processes that import this module, they must not start another server.
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tick-rate', type=int, default=TICK_RATE, help="simulation ticks per second, e.g. 20, 30 or 60")
+    parser.add_argument('--interest-radius', type=float, default=None, help="only send clients what is this close to them")
+    parser.add_argument('--workers', type=int, default=WORKERS, help="processes hosting rooms, 0 runs every room in the server process")
+    parser.add_argument('--aio', action='store_true', help=f"serve with grpc.aio on one event loop instead of a thread pool, which takes at most {MAX_STREAMS} Play streams")
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--metrics-port', type=int, default=METRICS_PORT, help="local Prometheus endpoint, 0 turns it off")
+    args = parser.parse_args()
+
+    (serve_aio if args.aio else serve)(
+        tick_rate=args.tick_rate, interest_radius=args.interest_radius, workers=args.workers, port=args.port,
+        metrics_port=args.metrics_port
+    )
\ No newline at end of file
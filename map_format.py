@@ -0,0 +1,117 @@
+from loguru import logger
+import hashlib
+import struct
+import json
+import os
+
+
+# Layout: header, palette of (identifier, r, g, b), then row-major tiles as (palette index, run length) pairs.
+# Palette index 0 is always the empty tile ' '. Run lengths are LEB128 varints.
+MAGIC = b'GMAP'
+VERSION = 1
+HEADER = struct.Struct('<4sBHHB')
+PALETTE_ENTRY = struct.Struct('<cBBB')
+
+
+def write_varint(out, value):
+    while value >= 0x80:
+        out.append(value & 0x7f | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data, offset):
+    value = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def pack(text_map, colors):
+    width = max(map(len, text_map), default=0)
+    height = len(text_map)
+    identifiers = [' '] + sorted(colors)
+    palette = {identifier: i for i, identifier in enumerate(identifiers)}
+
+    out = bytearray(HEADER.pack(MAGIC, VERSION, width, height, len(colors)))
+    for identifier in identifiers[1:]:
+        out += PALETTE_ENTRY.pack(identifier.encode('ascii'), *colors[identifier])
+
+    # Unknown identifiers become empty tiles, like the renderer already treats them.
+    tiles = [palette.get(tile, 0) for row in text_map for tile in row.ljust(width)]
+    start = 0
+    for i in range(1, len(tiles) + 1):
+        if i == len(tiles) or tiles[i] != tiles[start]:
+            out.append(tiles[start])
+            write_varint(out, i - start)
+            start = i
+    return bytes(out)
+
+
+def unpack(data):
+    magic, version, width, height, color_count = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Not a version {VERSION} map")
+
+    offset = HEADER.size
+    identifiers = [' ']
+    colors = {}
+    for _ in range(color_count):
+        identifier, r, g, b = PALETTE_ENTRY.unpack_from(data, offset)
+        offset += PALETTE_ENTRY.size
+        identifiers.append(identifier.decode('ascii'))
+        colors[identifiers[-1]] = (r, g, b)
+
+    tiles = []
+    while offset < len(data):
+        index = data[offset]
+        run, offset = read_varint(data, offset + 1)
+        tiles.append(identifiers[index] * run)
+    tiles = ''.join(tiles)
+    if len(tiles) != width * height:
+        raise ValueError("Map data is truncated")
+    return [tiles[y * width:(y + 1) * width] for y in range(height)], colors
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class MapData:
+    def __init__(self, text_map, colors, packed=None):
+        if packed is None:
+            packed = pack(text_map, colors)
+            # The server plays on exactly what clients unpack, where unknown identifiers are empty tiles.
+            text_map = unpack(packed)[0]
+        self.text_map = text_map
+        self.colors = colors
+        self.packed = packed
+        self.hash = content_hash(self.packed)
+
+    @classmethod
+    def from_packed(cls, data):
+        return cls(*unpack(data), packed=data)
+
+
+# path -> (modification time, MapData), so a map file is only parsed again after it changes.
+loaded_maps = {}
+
+
+def load_json_map(path):
+    modified = os.path.getmtime(path)
+    cached = loaded_maps.get(path)
+    if cached is not None and cached[0] == modified:
+        return cached[1]
+
+    with open(path, 'r') as f:
+        map_file = json.load(f)
+    if 'map' not in map_file or 'colors' not in map_file:
+        logger.error("Incorrect map format!")
+        return None
+    map_data = MapData(map_file['map'], {identifier: tuple(color) for identifier, color in map_file['colors'].items()})
+    loaded_maps[path] = modified, map_data
+    return map_data
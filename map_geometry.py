@@ -0,0 +1,17 @@
+from collision import CollisionGrid
+
+
+VIEW_SIZE = (800, 600)
+
+
+class MapGeometry:
+    # Where the map sits on the 800x600 view and which tiles are solid, with no pygame involved.
+    def __init__(self, text_map, view_size=VIEW_SIZE):
+        self.text_map = text_map
+        self.width = max(map(len, text_map), default=0)
+        self.height = len(text_map)
+        self.pixels_per_block = min(view_size[0] // self.width, view_size[1] // self.height)
+        self.size = (self.pixels_per_block * self.width, self.pixels_per_block * self.height)
+        # Centered the way pg.Rect(center=...) rounds.
+        self.origin = (view_size[0] // 2 - self.size[0] // 2, view_size[1] // 2 - self.size[1] // 2)
+        self.collision_grid = CollisionGrid(text_map, self.pixels_per_block, self.origin)
@@ -0,0 +1,27 @@
+import math
+from map_geometry import VIEW_SIZE
+
+
+PLAYER_SPEED = 200
+PLAYER_RADIUS = 10
+# Movement advances in fixed steps on both sides, so replaying the same inputs gives the same positions.
+INPUT_RATE = 60
+INPUT_STEP = 1 / INPUT_RATE
+
+
+def clamp(value, min_value, max_value):
+    return max(min(value, max_value), min_value)
+
+
+def move_player(collision_grid, x, y, move_x, move_y, dt=INPUT_STEP):
+    if collision_grid is None:
+        return x, y
+
+    # Any non-zero input moves at full speed, so oversized inputs can't make anyone faster.
+    length = math.hypot(move_x, move_y)
+    if length > 0:
+        move_x, move_y = move_x / length, move_y / length
+
+    new_x = clamp(x + move_x * PLAYER_SPEED * dt, PLAYER_RADIUS, VIEW_SIZE[0] - PLAYER_RADIUS)
+    new_y = clamp(y + move_y * PLAYER_SPEED * dt, PLAYER_RADIUS, VIEW_SIZE[1] - PLAYER_RADIUS)
+    return collision_grid.move_box(x, y, new_x, new_y, PLAYER_RADIUS)
@@ -0,0 +1,109 @@
+import grpc
+import asyncio
+import threading
+import weakref
+from loguru import logger
+from server.server import GameServicer, add_servicer_to_server, handle_console, PORT
+from server.simulation import TICK_RATE
+from server.rooms import WORKERS
+from server.metrics import serve_metrics, METRICS_PORT
+
+
+class SnapshotSignal:
+    # One wake-up per snapshot for all of a room's streams, whichever thread recorded it.
+    def __init__(self, loop, snapshots):
+        self.loop = loop
+        self.event = asyncio.Event()
+        snapshots.listeners.append(self.notify)
+
+    def notify(self, snapshot_id):
+        self.loop.call_soon_threadsafe(self.fire)
+
+    def fire(self):
+        event, self.event = self.event, asyncio.Event()
+        event.set()
+
+
+class AioGameServicer(GameServicer):
+    # Same logic as GameServicer, but every RPC is a coroutine on one event loop and rooms tick as tasks on it.
+    tick_tasks = True
+
+    def __init__(self, tick_rate=TICK_RATE, interest_radius=None, workers=0):
+        super().__init__(tick_rate, interest_radius, workers)
+        self.signals = weakref.WeakKeyDictionary()
+
+    def snapshot_signal(self, room):
+        signal = self.signals.get(room)
+        if signal is None:
+            signal = SnapshotSignal(asyncio.get_running_loop(), room.snapshots)
+            self.signals[room] = signal
+        return signal
+
+    async def Join(self, request, context):
+        joined = self.rooms.join(request.player_id, request.room_id)
+        return self.join_response(request, *await asyncio.wrap_future(joined))
+
+    async def Leave(self, request, context):
+        return self.leave_response(request, await asyncio.wrap_future(self.rooms.leave(request.player_id)))
+
+    async def Update(self, request, context):
+        return super().Update(request, context)
+
+    async def Shoot(self, request, context):
+        return super().Shoot(request, context)
+
+    async def GetMap(self, request, context):
+        chunks = self.map_chunks(request.map_hash)
+        if chunks is None:
+            await context.abort(grpc.StatusCode.NOT_FOUND, "Unknown map hash")
+        for chunk in chunks:
+            yield chunk
+
+    async def Play(self, request_iterator, context):
+        stream = {'client_id': None, 'room': None}
+
+        async def read_inputs():
+            async for request in request_iterator:
+                if not self.bind_stream(stream, request):
+                    return
+
+        reader = asyncio.create_task(read_inputs())
+        try:
+            snapshot_id = 0
+            while not reader.done():
+                room = stream['room']
+                if room is None:
+                    await asyncio.wait((reader,), timeout=0.1)
+                    continue
+                if self.stream_left(stream):
+                    break
+                # Taken before looking at the latest id, so a snapshot recorded in between still wakes us.
+                event = self.snapshot_signal(room).event
+                latest = room.snapshots.latest
+                if latest is None or latest.snapshot_id == snapshot_id:
+                    waiter = asyncio.ensure_future(event.wait())
+                    await asyncio.wait((reader, waiter), timeout=0.1, return_when=asyncio.FIRST_COMPLETED)
+                    waiter.cancel()
+                    continue
+                client_id = stream['client_id']
+                snapshot_id, payload = room.snapshots.encode(room.acked_snapshots.get(client_id, 0), client_id)
+                yield payload
+        finally:
+            reader.cancel()
+
+
+async def serve_async(tick_rate, interest_radius, workers, port, metrics_port):
+    servicer = AioGameServicer(tick_rate, interest_radius, workers)
+    if metrics_port:
+        serve_metrics(servicer.rooms, metrics_port)
+    server = grpc.aio.server()
+    add_servicer_to_server(servicer, server)
+    server.add_insecure_port(f'[::]:{port}')
+    await server.start()
+    logger.info(f"Asyncio server started on port {port}, ticking at {tick_rate} Hz with {workers} room workers")
+    threading.Thread(target=handle_console, args=[server, servicer, asyncio.get_running_loop()], daemon=True).start()
+    await server.wait_for_termination()
+
+
+def serve(tick_rate=TICK_RATE, interest_radius=None, workers=WORKERS, port=PORT, metrics_port=METRICS_PORT):
+    asyncio.run(serve_async(tick_rate, interest_radius, workers, port, metrics_port))
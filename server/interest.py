@@ -0,0 +1,38 @@
+import numpy as np
+from server.spatial_hash import SpatialHash
+
+
+class InterestManager:
+    # Cells as large as the radius, so everything in range is within one cell of the viewer's cell.
+    def __init__(self, radius, bounds):
+        self.radius = radius
+        self.player_hash = SpatialHash(radius, bounds)
+        self.bullet_hash = SpatialHash(radius, bounds)
+
+    def in_range(self, viewers, points, spatial_hash):
+        spatial_hash.rebuild(points, np.arange(len(points)), 0)
+        viewer_index, point_index = spatial_hash.query(viewers, reach=1)
+        offsets = viewers[viewer_index] - points[point_index]
+        close = (offsets ** 2).sum(axis=1) <= self.radius ** 2
+        return viewer_index[close], point_index[close]
+
+    def views(self, players, bullet_ids, bullet_positions):
+        # client_id -> (player ids, bullet ids) within the radius around that client's player.
+        slots = np.flatnonzero(players.active)
+        viewers = players.positions[slots]
+        visible_players = [set() for _ in slots]
+        visible_bullets = [set() for _ in slots]
+
+        viewer_index, player_index = self.in_range(viewers, viewers, self.player_hash)
+        for viewer, player in zip(viewer_index.tolist(), player_index.tolist()):
+            visible_players[viewer].add(players.ids[slots[player]])
+
+        if len(bullet_ids):
+            viewer_index, bullet_index = self.in_range(viewers, bullet_positions, self.bullet_hash)
+            for viewer, bullet in zip(viewer_index.tolist(), bullet_index.tolist()):
+                visible_bullets[viewer].add(int(bullet_ids[bullet]))
+
+        return {
+            players.ids[slot]: (frozenset(visible_players[i]), frozenset(visible_bullets[i]))
+            for i, slot in enumerate(slots)
+        }
@@ -0,0 +1,139 @@
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from collections import deque
+from bisect import bisect_left
+from loguru import logger
+import threading
+import numpy as np
+
+
+METRICS_PORT = 9101
+# Percentiles are taken over the last this many samples; bucket counts are kept forever like Prometheus expects.
+WINDOW = 600
+SECONDS_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.0166, 0.025, 0.05, 0.1, 0.25, 1)
+BYTES_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 65536)
+
+
+class Histogram:
+    def __init__(self, buckets=SECONDS_BUCKETS, window=WINDOW):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+
+    def percentiles(self, *percents):
+        recent = list(self.recent)
+        if not recent:
+            return [0] * len(percents)
+        return np.percentile(recent, percents)
+
+    def summary(self, scale=1000, unit='ms'):
+        p50, p99 = self.percentiles(50, 99)
+        peak = max(self.recent, default=0)
+        return f"p50={p50 * scale:.3f} p99={p99 * scale:.3f} max={peak * scale:.3f} {unit}"
+
+    def lines(self, name, labels):
+        cumulative = 0
+        for edge, count in zip((*self.buckets, '+Inf'), self.counts):
+            cumulative += count
+            yield f'{name}_bucket{format_labels({**labels, "le": edge})} {cumulative}'
+        yield f'{name}_sum{format_labels(labels)} {self.sum}'
+        yield f'{name}_count{format_labels(labels)} {self.count}'
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in labels.items()) + '}'
+
+
+# RPC threads of both server modes observe into these, hence the lock.
+rpc_latencies = {}
+rpc_lock = threading.Lock()
+
+
+def observe_rpc(method, seconds):
+    with rpc_lock:
+        histogram = rpc_latencies.get(method)
+        if histogram is None:
+            histogram = rpc_latencies[method] = Histogram()
+        histogram.observe(seconds)
+
+
+def render(rooms):
+    lines = []
+
+    def family(name, kind, description):
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} {kind}')
+
+    room_stats = []
+    for room_id, room in list(rooms.rooms.items()):
+        stats = room.stats
+        # A worker room that didn't answer is left out of this scrape.
+        if stats is not None:
+            room_stats.append((room_id, room, stats))
+
+    family('game_tick_seconds', 'histogram', "Time spent in one simulation tick.")
+    for room_id, _, stats in room_stats:
+        lines.extend(stats.tick.lines('game_tick_seconds', {'room': room_id}))
+    family('game_tick_phase_seconds', 'histogram', "Time spent in each phase of a tick.")
+    for room_id, _, stats in room_stats:
+        for phase, histogram in list(stats.phases.items()):
+            lines.extend(histogram.lines('game_tick_phase_seconds', {'room': room_id, 'phase': phase}))
+    family('game_tick_overruns_total', 'counter', "Ticks that took longer than the tick interval.")
+    for room_id, _, stats in room_stats:
+        lines.append(f'game_tick_overruns_total{format_labels({"room": room_id})} {stats.overruns}')
+    family('game_ticks_dropped_total', 'counter', "Ticks skipped to recover from stalls.")
+    for room_id, _, stats in room_stats:
+        lines.append(f'game_ticks_dropped_total{format_labels({"room": room_id})} {stats.dropped_ticks}')
+    family('game_players', 'gauge', "Players in the room.")
+    for room_id, _, stats in room_stats:
+        lines.append(f'game_players{format_labels({"room": room_id})} {stats.players}')
+    family('game_bullets', 'gauge', "Bullets in flight in the room.")
+    for room_id, _, stats in room_stats:
+        lines.append(f'game_bullets{format_labels({"room": room_id})} {stats.bullets}')
+
+    family('game_snapshot_payload_bytes', 'histogram', "Size of each snapshot payload sent to a client.")
+    for room_id, room, _ in room_stats:
+        lines.extend(room.snapshots.stats.payload_bytes.lines('game_snapshot_payload_bytes', {'room': room_id}))
+    family('game_snapshot_cache_lookups_total', 'counter', "Snapshot encode cache lookups.")
+    for room_id, room, _ in room_stats:
+        snapshot_stats = room.snapshots.stats
+        lines.append(f'game_snapshot_cache_lookups_total{format_labels({"room": room_id, "result": "hit"})} {snapshot_stats.cache_hits}')
+        lines.append(f'game_snapshot_cache_lookups_total{format_labels({"room": room_id, "result": "miss"})} {snapshot_stats.cache_misses}')
+
+    family('game_rpc_seconds', 'histogram', "Unary RPC handler latency.")
+    with rpc_lock:
+        for method, histogram in rpc_latencies.items():
+            lines.extend(histogram.lines('game_rpc_seconds', {'method': method}))
+    return '\n'.join(lines) + '\n'
+
+
+def serve_metrics(rooms, port=METRICS_PORT):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != '/metrics':
+                self.send_error(404)
+                return
+            body = render(rooms).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    # Local only, scraped by an agent on the same host.
+    server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info(f"Metrics on http://127.0.0.1:{port}/metrics")
+    return server
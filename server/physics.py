@@ -0,0 +1,245 @@
+from collections import deque
+import numpy as np
+import game_pb2
+
+
+PLAYER_HALF_SIZE = 10
+
+
+class PlayerBuffer:
+    def __init__(self, capacity, history_length=1):
+        self.capacity = capacity
+        self.slots = {}
+        self.ids = [None] * capacity
+        self.next_uid = 0
+        self.uids = np.full(capacity, -1, dtype=np.int64)
+        self.active = np.zeros(capacity, dtype=bool)
+        self.positions = np.zeros((capacity, 2))
+        self.directions = np.zeros(capacity)
+        self.hps = np.zeros(capacity, dtype=np.int32)
+        # Movement inputs waiting for their tick, and how much input time each player may still spend.
+        self.pending_inputs = [deque() for _ in range(capacity)]
+        self.last_inputs = np.zeros(capacity, dtype=np.int64)
+        self.input_credit = np.zeros(capacity)
+        # Positions of the last `history_length` ticks, row tick % history_length, for rewinding hit checks.
+        self.history_length = history_length
+        self.history = np.zeros((history_length, capacity, 2), dtype=np.float32)
+
+    def __len__(self):
+        return len(self.slots)
+
+    def __contains__(self, player_id):
+        return player_id in self.slots
+
+    def add(self, player_id, hp, position=(0, 0)):
+        slot = int(np.argmin(self.active))
+        if self.active[slot]:
+            return None
+        self.slots[player_id] = slot
+        self.ids[slot] = player_id
+        self.uids[slot] = self.next_uid
+        self.next_uid += 1
+        self.active[slot] = True
+        self.positions[slot] = position
+        self.directions[slot] = 0
+        self.hps[slot] = hp
+        self.pending_inputs[slot].clear()
+        self.last_inputs[slot] = 0
+        self.input_credit[slot] = 0
+        # Nothing to rewind to before joining, the whole history starts where the player spawns.
+        self.history[:, slot] = position
+        return slot
+
+    def remove(self, player_id):
+        slot = self.slots.pop(player_id)
+        self.ids[slot] = None
+        self.uids[slot] = -1
+        self.active[slot] = False
+
+    def record(self, tick):
+        self.history[tick % self.history_length] = self.positions
+
+    def states(self):
+        return [
+            game_pb2.PlayerState(
+                client_id=player_id,
+                position=game_pb2.Vec2(x=self.positions[slot, 0], y=self.positions[slot, 1]),
+                direction=self.directions[slot],
+                hp=self.hps[slot],
+                last_input_seq=self.last_inputs[slot]
+            )
+            for player_id, slot in self.slots.items()
+        ]
+
+
+class BulletBuffer:
+    def __init__(self, capacity=256):
+        self.count = 0
+        self.allocate(capacity)
+
+    def allocate(self, capacity):
+        old_count = self.count
+        fields = {
+            'ids': np.zeros(capacity, dtype=np.int64),
+            'owners': np.zeros(capacity, dtype=np.int64),
+            'spawn_ticks': np.zeros(capacity, dtype=np.int64),
+            'origins': np.zeros((capacity, 2)),
+            'positions': np.zeros((capacity, 2)),
+            'directions': np.zeros((capacity, 2)),
+            'rewinds': np.zeros(capacity, dtype=np.int64),
+        }
+        for name, array in fields.items():
+            if old_count:
+                array[:old_count] = getattr(self, name)[:old_count]
+            setattr(self, name, array)
+        self.capacity = capacity
+
+    def add(self, bullet_id, owner_uid, spawn_tick, position, direction, rewind=0):
+        if self.count == self.capacity:
+            self.allocate(self.capacity * 2)
+        i = self.count
+        self.ids[i] = bullet_id
+        self.owners[i] = owner_uid
+        self.spawn_ticks[i] = spawn_tick
+        self.origins[i] = position
+        self.positions[i] = position
+        self.directions[i] = direction
+        self.rewinds[i] = rewind
+        self.count += 1
+
+    def keep(self, mask):
+        kept = int(mask.sum())
+        for array in (self.ids, self.owners, self.spawn_ticks, self.origins, self.positions, self.directions, self.rewinds):
+            array[:kept] = array[:self.count][mask]
+        self.count = kept
+
+    def message(self, i, owner_id):
+        return game_pb2.Bullet(
+            owner_id=owner_id,
+            bullet_id=self.ids[i],
+            position=game_pb2.Vec2(x=self.origins[i, 0], y=self.origins[i, 1]),
+            direction=game_pb2.Vec2(x=self.directions[i, 0], y=self.directions[i, 1]),
+            spawn_tick=self.spawn_ticks[i]
+        )
+
+
+def solid_mask(collision_grid, solid, xs, ys):
+    ppb = collision_grid.pixels_per_block
+    cell_x = np.floor((xs - collision_grid.origin[0]) / ppb).astype(np.int64)
+    cell_y = np.floor((ys - collision_grid.origin[1]) / ppb).astype(np.int64)
+    inside = (cell_x >= 0) & (cell_x < collision_grid.width) & (cell_y >= 0) & (cell_y < collision_grid.height)
+    result = np.zeros(len(xs), dtype=bool)
+    result[inside] = solid[cell_y[inside], cell_x[inside]] != 0
+    return result
+
+
+def grid_array(collision_grid):
+    return np.frombuffer(collision_grid.solid, dtype=np.uint8).reshape(collision_grid.height, collision_grid.width)
+
+
+def live_slots(players):
+    return np.flatnonzero(players.active & (players.hps > 0))
+
+
+def segment_box_times(starts, ends, centers, half_size):
+    # Slab test: fraction of each segment at which it enters its box, inf when it misses.
+    direction = ends - starts
+    low = centers - half_size - starts
+    high = centers + half_size - starts
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t1 = low / direction
+        t2 = high / direction
+    parallel = direction == 0
+    inside = (low < 0) & (high > 0)
+    near = np.where(parallel, np.where(inside, -np.inf, np.inf), np.minimum(t1, t2)).max(axis=1)
+    far = np.where(parallel, np.where(inside, np.inf, -np.inf), np.maximum(t1, t2)).min(axis=1)
+    hits = (near <= far) & (far >= 0) & (near <= 1)
+    return np.where(hits, np.maximum(near, 0), np.inf)
+
+
+def rewind_drift(players, slots):
+    # Furthest any live player is from where the history has it, i.e. how far a rewound box can be from its current one.
+    if players.history_length == 1 or len(slots) == 0:
+        return 0
+    return float(np.abs(players.history[:, slots] - players.positions[slots]).max())
+
+
+def sweep_players(players, starts, ends, owners, spatial_hash=None, rewinds=None, tick=0):
+    # A bullet hits the first live, non-owner player its path from `starts` to `ends` enters.
+    # Bullets with a rewind test players where they were that many ticks ago, which is what their shooter saw.
+    hit = np.zeros(len(starts), dtype=bool)
+    targets = np.full(len(starts), players.capacity, dtype=np.int64)
+    times = np.full(len(starts), np.inf)
+    slots = live_slots(players)
+    if len(slots) == 0 or len(starts) == 0:
+        return hit, targets, times
+
+    rewound = np.zeros(len(starts), dtype=bool) if rewinds is None else rewinds > 0
+    drift = rewind_drift(players, slots) if rewound.any() else 0
+    if spatial_hash is not None:
+        present = np.flatnonzero(~rewound)
+        bullet_index, slot_index = spatial_hash.query_segments(starts[present], ends[present])
+        bullet_index = present[bullet_index]
+        back = np.flatnonzero(rewound)
+        if len(back):
+            # Rewound boxes can be up to `drift` away from the hashed ones, so look that much further around.
+            half_length = np.sqrt(((ends[back] - starts[back]) ** 2).sum(axis=1)).max() / 2
+            reach = int(np.ceil((half_length + drift) / spatial_hash.cell_size))
+            back_index, back_slots = spatial_hash.query((starts[back] + ends[back]) / 2, reach)
+            bullet_index = np.concatenate((bullet_index, back[back_index]))
+            slot_index = np.concatenate((slot_index, back_slots))
+    else:
+        low = np.minimum(starts[:, 0], ends[:, 0])
+        high = np.maximum(starts[:, 0], ends[:, 0])
+        margin = (PLAYER_HALF_SIZE + np.where(rewound, drift, 0))[:, None]
+        player_xs = players.positions[slots, 0]
+        near_x = (low[:, None] < player_xs + margin) & (high[:, None] > player_xs - margin)
+        bullet_index, slot_index = np.nonzero(near_x)
+        slot_index = slots[slot_index]
+
+    centers = players.positions[slot_index]
+    back = rewound[bullet_index]
+    if back.any():
+        rows = (tick - rewinds[bullet_index[back]]) % players.history_length
+        centers[back] = players.history[rows, slot_index[back]]
+    t = segment_box_times(starts[bullet_index], ends[bullet_index], centers, PLAYER_HALF_SIZE)
+    valid = np.isfinite(t) & (owners[bullet_index] != players.uids[slot_index])
+    bullet_index, slot_index, t = bullet_index[valid], slot_index[valid], t[valid]
+
+    # Earliest entry wins, ties go to the lowest slot.
+    order = np.lexsort((slot_index, t, bullet_index))
+    bullet_index, slot_index, t = bullet_index[order], slot_index[order], t[order]
+    first = np.unique(bullet_index, return_index=True)[1]
+    hit[bullet_index[first]] = True
+    targets[bullet_index[first]] = slot_index[first]
+    times[bullet_index[first]] = t[first]
+    return hit, targets, times
+
+
+def landed_hits(hit, targets, times, hps, damage):
+    # In path order a target only takes hits up to the one that kills it, the bullets behind that fly on.
+    index = np.flatnonzero(hit)
+    index = index[np.lexsort((times[index], targets[index]))]
+    hit_targets = targets[index]
+    firsts = np.flatnonzero(np.r_[True, hit_targets[1:] != hit_targets[:-1]])
+    ranks = np.arange(len(index)) - np.repeat(firsts, np.diff(np.r_[firsts, len(index)]))
+    landed = hit.copy()
+    landed[index[ranks >= -(-hps[hit_targets] // damage)]] = False
+    return landed
+
+
+def sweep_walls(collision_grid, solid, starts, ends):
+    # Fraction of each segment at which it enters a wall, inf when it stays clear.
+    times = np.full(len(starts), np.inf)
+    ppb = collision_grid.pixels_per_block
+    start_cells = np.floor((starts - collision_grid.origin) / ppb)
+    end_cells = np.floor((ends - collision_grid.origin) / ppb)
+    same_cell = (start_cells == end_cells).all(axis=1)
+
+    # Most bullets stay inside one tile per tick, a lookup is enough for them.
+    times[same_cell & solid_mask(collision_grid, solid, ends[:, 0], ends[:, 1])] = 0
+    for i in np.flatnonzero(~same_cell):
+        t = collision_grid.raycast(starts[i, 0], starts[i, 1], ends[i, 0], ends[i, 1])
+        if t is not None:
+            times[i] = t
+    return times
@@ -0,0 +1,328 @@
+from concurrent.futures import Future
+from loguru import logger
+import multiprocessing
+import itertools
+import threading
+import copy
+import os
+import game_pb2
+from server.simulation import Simulation
+from server.snapshots import SnapshotHistory
+
+
+# Matchmaking fills a room up to this many players before it opens another one.
+ROOM_SIZE = 16
+MAX_CLIENTS = 1024
+# Seconds to wait for a worker room's tick stats before the console or /metrics skip it.
+STATS_TIMEOUT = 1
+# One core is left for the RPC threads, which do the per-client snapshot encoding.
+WORKERS = max(0, (os.cpu_count() or 1) - 1)
+
+
+class SnapshotForwarder:
+    # Stands in for a room's SnapshotHistory inside a worker: every snapshot crosses the pipe once,
+    # deltas and per-client encodes are made in the main process next to the RPCs.
+    def __init__(self, send, room_id):
+        self.send = send
+        self.room_id = room_id
+
+    def record(self, server_tick, players, bullets, bullet_ends, views=None, map_change=None):
+        payload = game_pb2.UpdateResponse(
+            states=players, bullets=bullets, bullet_ends=bullet_ends, map_change=map_change
+        ).SerializeToString()
+        self.send(('snapshot', self.room_id, server_tick, payload, views))
+
+
+def run_worker(connection):
+    send_lock = threading.Lock()
+    rooms = {}
+
+    def send(message):
+        with send_lock:
+            connection.send(message)
+
+    def reply(call_id, future):
+        error = future.exception()
+        send(('result', call_id, error, None if error else future.result()))
+
+    while True:
+        try:
+            command, call_id, room_id, args = connection.recv()
+        except EOFError:
+            break
+        if command == 'stop':
+            break
+        if command == 'open':
+            room = Simulation(*args, snapshots=SnapshotForwarder(send, room_id))
+            room.start()
+            rooms[room_id] = room
+            continue
+
+        room = rooms.get(room_id)
+        if room is None:
+            logger.error(f"Worker has no room {room_id} for {command}")
+            # Whoever sent a call_id is waiting on the answer.
+            if call_id is not None:
+                send(('result', call_id, KeyError(room_id), None))
+        elif command == 'close':
+            rooms.pop(room_id).stop()
+        elif command == 'update':
+            room.update(game_pb2.UpdateRequest.FromString(args[0]))
+        elif command == 'shoot':
+            room.shoot(*args)
+        elif command in ('join', 'leave', 'change_map'):
+            getattr(room, command)(*args).add_done_callback(lambda future, call_id=call_id: reply(call_id, future))
+        elif command == 'stats':
+            # Copied on the tick thread so the histograms aren't changing while they are pickled.
+            room.submit(copy.deepcopy, room.stats).add_done_callback(lambda future, call_id=call_id: reply(call_id, future))
+
+    for room in rooms.values():
+        room.stop()
+
+
+class Worker:
+    def __init__(self, context):
+        self.connection, child_connection = context.Pipe()
+        self.process = context.Process(target=run_worker, args=(child_connection,), daemon=True)
+        self.process.start()
+        child_connection.close()
+        self.send_lock = threading.Lock()
+        self.call_ids = itertools.count(1)
+        self.pending = {}
+        self.rooms = {}
+        threading.Thread(target=self.receive, daemon=True).start()
+
+    def send(self, command, room_id, *args, call_id=None):
+        with self.send_lock:
+            self.connection.send((command, call_id, room_id, args))
+
+    def call(self, command, room_id, *args):
+        future = Future()
+        call_id = next(self.call_ids)
+        self.pending[call_id] = future
+        try:
+            self.send(command, room_id, *args, call_id=call_id)
+        except OSError:
+            self.pending.pop(call_id, None)
+            future.set_exception(RuntimeError("Worker process exited"))
+        return future
+
+    def receive(self):
+        while True:
+            try:
+                message = self.connection.recv()
+            except (EOFError, OSError):
+                break
+            if message[0] == 'snapshot':
+                _, room_id, server_tick, payload, views = message
+                room = self.rooms.get(room_id)
+                if room is not None:
+                    room.receive_snapshot(server_tick, payload, views)
+                continue
+            _, call_id, error, result = message
+            future = self.pending.pop(call_id)
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+        for future in self.pending.values():
+            future.set_exception(RuntimeError("Worker process exited"))
+
+    def stop(self):
+        self.send('stop', None)
+
+
+class RoomHandle:
+    # Same surface as a Simulation, for a room ticking in a worker process.
+    def __init__(self, worker, room_id, collision_grid, tick_rate, interest_radius, map_hash):
+        self.worker = worker
+        self.room_id = room_id
+        self.tick_rate = tick_rate
+        self.snapshots = SnapshotHistory()
+        self.acked_snapshots = {}
+        worker.rooms[room_id] = self
+        worker.send('open', room_id, collision_grid, tick_rate, interest_radius, map_hash)
+
+    @property
+    def stats(self):
+        # A copy of the worker's TickStats, fetched on every access. None if the room didn't answer in time.
+        try:
+            return self.worker.call('stats', self.room_id).result(timeout=STATS_TIMEOUT)
+        except Exception as error:
+            logger.warning(f"No stats from room {self.room_id}: {error!r}")
+            return None
+
+    def receive_snapshot(self, server_tick, payload, views):
+        response = game_pb2.UpdateResponse.FromString(payload)
+        self.snapshots.record(
+            server_tick, list(response.states), list(response.bullets), list(response.bullet_ends), views,
+            response.map_change if response.HasField('map_change') else None
+        )
+
+    def join(self, player_id):
+        return self.worker.call('join', self.room_id, player_id)
+
+    def leave(self, player_id):
+        self.acked_snapshots.pop(player_id, None)
+        return self.worker.call('leave', self.room_id, player_id)
+
+    def update(self, request):
+        if request.ack_snapshot_id > self.acked_snapshots.get(request.client_id, 0):
+            self.acked_snapshots[request.client_id] = request.ack_snapshot_id
+        self.worker.send('update', self.room_id, request.SerializeToString())
+
+    def shoot(self, player_id):
+        self.worker.send('shoot', self.room_id, player_id)
+
+    def change_map(self, collision_grid, map_hash):
+        return self.worker.call('change_map', self.room_id, collision_grid, map_hash)
+
+    def stop(self):
+        self.worker.rooms.pop(self.room_id, None)
+        try:
+            self.worker.send('close', self.room_id)
+        except OSError:
+            # The worker exited and took the room with it.
+            pass
+
+
+class RoomManager:
+    def __init__(self, map_data, collision_grid, tick_rate, interest_radius=None, workers=0, tick_tasks=False):
+        self.map_data = map_data
+        self.collision_grid = collision_grid
+        self.tick_rate = tick_rate
+        self.interest_radius = interest_radius
+        # Under the asyncio server, rooms in this process tick as tasks on its event loop instead of threads.
+        self.tick_tasks = tick_tasks
+        self.rooms = {}
+        # Rooms that got their own map through `reloadmap <room_id>`.
+        self.room_maps = {}
+        self.room_players = {}
+        self.players = {}
+        self.room_ids = itertools.count(1)
+        self.lock = threading.Lock()
+        # Without workers every room ticks on a thread of this process.
+        context = multiprocessing.get_context('spawn')
+        self.workers = [Worker(context) for _ in range(workers)]
+
+    def open_room(self, room_id):
+        if self.workers:
+            worker = min(self.workers, key=lambda w: len(w.rooms))
+            room = RoomHandle(
+                worker, room_id, self.collision_grid, self.tick_rate, self.interest_radius, self.map_data.hash
+            )
+        else:
+            room = Simulation(self.collision_grid, self.tick_rate, self.interest_radius, self.map_data.hash)
+            if self.tick_tasks:
+                room.start_task()
+            else:
+                room.start()
+        self.rooms[room_id] = room
+        self.room_players[room_id] = set()
+        logger.info(f"Opened room {room_id}.")
+        return room
+
+    def close_room(self, room_id):
+        # Called under the lock, the caller stops the room once it let go of it.
+        self.room_players.pop(room_id, None)
+        self.room_maps.pop(room_id, None)
+        logger.info(f"Closed room {room_id}.")
+        return self.rooms.pop(room_id, None)
+
+    def find_room(self):
+        for room_id, players in self.room_players.items():
+            if len(players) < ROOM_SIZE:
+                return room_id
+        room_id = str(next(self.room_ids))
+        while room_id in self.rooms:
+            room_id = str(next(self.room_ids))
+        return room_id
+
+    def room_of(self, player_id):
+        return self.rooms.get(self.players.get(player_id))
+
+    def map_for(self, room_id):
+        return self.room_maps.get(room_id, self.map_data)
+
+    def join(self, player_id, room_id=''):
+        joined = Future()
+        with self.lock:
+            if player_id in self.players:
+                joined.set_result((room_id, False, "Player ID already exists!"))
+                return joined
+            if len(self.players) >= MAX_CLIENTS:
+                joined.set_result((room_id, False, "Server is full!"))
+                return joined
+            room_id = room_id or self.find_room()
+            room = self.rooms.get(room_id) or self.open_room(room_id)
+            # Counted before the room answers, so it can't be closed under a pending join.
+            self.players[player_id] = room_id
+            self.room_players[room_id].add(player_id)
+
+        def finish(future):
+            if future.exception() is not None:
+                success, message = False, "Room closed, try again."
+            else:
+                success, message = future.result()
+            if not success:
+                self.forget(player_id)
+            joined.set_result((room_id, success, message))
+
+        room.join(player_id).add_done_callback(finish)
+        return joined
+
+    def leave(self, player_id):
+        left = Future()
+        room = self.room_of(player_id)
+        if room is None:
+            left.set_result(False)
+            return left
+
+        def finish(future):
+            self.forget(player_id)
+            # A room stopped under the call is gone along with the player.
+            left.set_result(future.exception() is None and future.result())
+
+        room.leave(player_id).add_done_callback(finish)
+        return left
+
+    def forget(self, player_id):
+        with self.lock:
+            room_id = self.players.pop(player_id, None)
+            if room_id is None:
+                return
+            self.room_players[room_id].discard(player_id)
+            if self.room_players[room_id]:
+                return
+            room = self.close_room(room_id)
+        # Stopping fails the room's queued commands, whose callbacks come back here for the lock.
+        # It is None when stop() emptied the rooms before stopping them.
+        if room is not None:
+            room.stop()
+
+    def change_map(self, map_data, collision_grid, room_id=None):
+        with self.lock:
+            if room_id is None:
+                self.map_data = map_data
+                self.collision_grid = collision_grid
+                self.room_maps.clear()
+                rooms = list(self.rooms.values())
+            elif room_id in self.rooms:
+                self.room_maps[room_id] = map_data
+                rooms = [self.rooms[room_id]]
+            else:
+                return False
+        for room in rooms:
+            room.change_map(collision_grid, map_data.hash)
+        return True
+
+    def stop(self):
+        with self.lock:
+            rooms = list(self.rooms.values())
+            self.rooms.clear()
+        # Outside the lock, stopping a room fails its pending joins and leaves, which call forget().
+        for room in rooms:
+            room.stop()
+        for worker in self.workers:
+            worker.stop()
@@ -4,162 +4,230 @@ import game_pb2_grpc
 from concurrent import futures
 from loguru import logger
 import threading
+import asyncio
 import time
-import math
-import json
-from Map import Map
-import pygame as pg
+from map_geometry import MapGeometry
+from map_format import load_json_map
+from server.simulation import BULLET_SPEED, TICK_RATE
+from server.rooms import RoomManager, WORKERS
+from server.metrics import observe_rpc, rpc_latencies, serve_metrics, METRICS_PORT
 
 
 RUNNING = True
+PORT = 12345
+# Every Play stream holds a pool thread for its whole lifetime, so the threaded server takes at most this many.
+# Streams past it are refused with RESOURCE_EXHAUSTED, the asyncio server only has the MAX_CLIENTS limit.
+MAX_STREAMS = 256
+# The rest is for unary calls.
+MAX_WORKERS = MAX_STREAMS + 16
+MAP_CHUNK_SIZE = 32 * 1024
 
 
 class GameServicer(game_pb2_grpc.GameServicer):
-    def __init__(self):
-        self.players = {}
-        self.hps = {}
-        self.bullets = []
-        self.update_thread = threading.Thread(target=self.update_loop)
-        self.update_thread.start()
-        self.bullet_id_counter = 0
-        self.map_proto = self.create_map_proto_object()
-        self.text_map = self.map_proto.map
-        self.map = Map(self.map_proto)
+    tick_tasks = False
+
+    def __init__(self, tick_rate=TICK_RATE, interest_radius=None, workers=0):
+        self.rooms = None
+        # Every map served since startup, by hash, for GetMap.
+        self.maps = {}
+        self.streams = 0
+        self.streams_lock = threading.Lock()
+        self.load_map()
+        self.rooms = RoomManager(self.map_data, self.collision_grid, tick_rate, interest_radius, workers, self.tick_tasks)
 
     def Join(self, request, context):
-        logger.info(f"Player {request.player_id} joined the game.")
-        if request.player_id in self.players:
-            return game_pb2.JoinResponse(message="Player ID already exists!", success=False)
-        self.add_player(request)
-        return game_pb2.JoinResponse(message="Successfully joined the game!", success=True, map=self.map_proto)
-
-    def add_player(self, request):
-        player_state = game_pb2.PlayerState(
-            client_id=request.player_id, 
-            position=game_pb2.Vec2(x=0, y=0), 
-            direction=0.0
+        return self.join_response(request, *self.rooms.join(request.player_id, request.room_id).result())
+
+    def join_response(self, request, room_id, success, message):
+        if not success:
+            return game_pb2.JoinResponse(message=message, success=False)
+        logger.info(f"Player {request.player_id} joined room {room_id}.")
+        return game_pb2.JoinResponse(
+            message=message, success=True, map_hash=self.rooms.map_for(room_id).hash,
+            tick_rate=self.rooms.tick_rate, bullet_speed=BULLET_SPEED, room_id=room_id
         )
-        self.players[request.player_id] = player_state
-        self.hps[request.player_id] = 100
-        logger.info(f"Added player {request.player_id} to the game.")
 
     def Leave(self, request, context):
-        logger.info(f"Player {request.player_id} left the game.")
-        if request.player_id not in self.players:
+        return self.leave_response(request, self.rooms.leave(request.player_id).result())
+
+    def leave_response(self, request, success):
+        if not success:
             return game_pb2.LeaveResponse(message="Player ID does not exist!", success=False)
-        del self.players[request.player_id]
+        logger.info(f"Player {request.player_id} left the game.")
         return game_pb2.LeaveResponse(message="Successfully left the game!", success=True)
 
     def Update(self, request, context):
-        self.update_player(request)
-        response = game_pb2.UpdateResponse(states=self.players.values(), bullets=self.bullets)
-        return response
-
-    def update_player(self, request):
-        if request.client_id not in self.players:
-            return
-        player_state = self.players[request.client_id]
-        player_state.position.x = request.position.x
-        player_state.position.y = request.position.y
-        player_state.direction = request.direction
-        player_state.hp = self.hps[request.client_id]
-    
-    def update_loop(self):
-        global RUNNING
-        logger.info("Update thread started!")
-        last_time = time.time()
-        dt = 0
-        while RUNNING:
-            time.sleep(1 / 60)
-            current_time = time.time()
-            dt = current_time - last_time
-            last_time = current_time
-            self.update_bullets(dt)
-
-    def update_bullets(self, dt):
-        bullet_speed = 500
-        for bullet in self.bullets:
-            bullet.position.x += bullet.direction.x * bullet_speed * dt
-            bullet.position.y += bullet.direction.y * bullet_speed * dt
-            if not self.in_bounds(bullet.position) or self.inside_wall(bullet.position):
-                self.bullets.remove(bullet)
-            collides, who = self.collides_with_players(bullet)
-            if collides:
-                self.hps[who.client_id] -= 10
-                self.bullets.remove(bullet)
-
-    def collides_with_players(self, bullet):
-        for player in self.players.values():
-            if player.client_id == bullet.owner_id:
+        room = self.rooms.room_of(request.client_id)
+        if room is None:
+            return b''
+        room.update(request)
+        _, payload = room.snapshots.encode(request.ack_snapshot_id, request.client_id)
+        return payload
+
+    def Play(self, request_iterator, context):
+        with self.streams_lock:
+            full = self.streams >= MAX_STREAMS
+            if not full:
+                self.streams += 1
+        if full:
+            context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, "Too many game streams, try again later.")
+        try:
+            yield from self.play_stream(request_iterator, context)
+        finally:
+            with self.streams_lock:
+                self.streams -= 1
+
+    def play_stream(self, request_iterator, context):
+        inputs_closed = threading.Event()
+        stream = {'client_id': None, 'room': None}
+
+        def read_inputs():
+            try:
+                for request in request_iterator:
+                    if not self.bind_stream(stream, request):
+                        break
+            except grpc.RpcError:
+                pass
+            finally:
+                inputs_closed.set()
+
+        threading.Thread(target=read_inputs, daemon=True).start()
+
+        snapshot_id = 0
+        while RUNNING and context.is_active() and not inputs_closed.is_set():
+            room = stream['room']
+            if room is None:
+                inputs_closed.wait(0.1)
                 continue
-            if self.hps[player.client_id] <= 0:
+            if self.stream_left(stream):
+                break
+            client_id = stream['client_id']
+            latest_id = room.snapshots.wait_for_newer(snapshot_id)
+            if latest_id == snapshot_id:
                 continue
-            player_collider = pg.Rect(
-                player.position.x - 10, 
-                player.position.y - 10, 
-                20,
-                20
-            )
-            if player_collider.collidepoint(bullet.position.x, bullet.position.y):
-                return True, player
-        return False, None
-
-    
-    def inside_wall(self, position):        
-        ppb = self.map.pixels_per_block
-        map_top_left = self.map.rect.topleft
-
-        for y, row in enumerate(self.text_map):
-            for x, cell in enumerate(row):
-                if cell == ' ':
-                    continue
-
-                cell_rect = pg.Rect(x * ppb + map_top_left[0], y * ppb + map_top_left[1], ppb, ppb)
-                if cell_rect.collidepoint(position.x, position.y):
-                    return True
-        
-        return False
+            snapshot_id, payload = room.snapshots.encode(room.acked_snapshots.get(client_id, 0), client_id)
+            yield payload
 
+    # Play streams of both server modes are bound through these two.
+    def bind_stream(self, stream, request):
+        # Follows the input's player into its room and applies it. False once that player was kicked or left.
+        room = self.rooms.room_of(request.client_id)
+        if room is None:
+            return stream['room'] is None
+        stream['client_id'] = request.client_id
+        stream['room'] = room
+        room.update(request)
+        return True
 
-    def in_bounds(self, position): # too bad, will break if client's map size changes
-        return 0 <= position.x <= 800 and 0 <= position.y <= 600
+    def stream_left(self, stream):
+        # Checked before every wait for a snapshot, so a kick doesn't need another input to end the stream.
+        return self.rooms.room_of(stream['client_id']) is not stream['room']
 
     def Shoot(self, request, context):
-        id_shot_by = request.player_id
-        player = self.players.get(id_shot_by)
-        if not player:
+        room = self.rooms.room_of(request.player_id)
+        if room is None:
             return game_pb2.ShootResponse(success=False)
-         
-        bullet = game_pb2.Bullet(
-            position=game_pb2.Vec2(x=player.position.x, y=player.position.y),
-            direction=game_pb2.Vec2(x=math.cos(player.direction), y=math.sin(player.direction)),
-            owner_id=id_shot_by,
-            bullet_id=self.bullet_id_counter
-        )
-
-        self.bullet_id_counter += 1
-
-        self.bullets.append(bullet)
+        room.shoot(request.player_id)
         return game_pb2.ShootResponse(success=True)
 
-    def create_map_proto_object(self, map_name='map.json'):
-        with open(map_name, 'r') as f:
-            map_file = json.load(f)
-        if 'map' not in map_file or 'colors' not in map_file:
-            logger.error("Incorrect map format!")   
+    def GetMap(self, request, context):
+        chunks = self.map_chunks(request.map_hash)
+        if chunks is None:
+            context.abort(grpc.StatusCode.NOT_FOUND, "Unknown map hash")
+        yield from chunks
+
+    def map_chunks(self, map_hash):
+        map_data = self.maps.get(map_hash)
+        if map_data is None:
             return None
-        color_map = [
-            game_pb2.ColorMapEntry(
-                color=game_pb2.Color(r=color[0], g=color[1], b=color[2]), 
-                identifier=identifier
-            )
-            for identifier, color in map_file['colors'].items()
+        packed = map_data.packed
+        return [
+            game_pb2.MapChunk(total_size=len(packed), data=packed[offset:offset + MAP_CHUNK_SIZE])
+            for offset in range(0, max(len(packed), 1), MAP_CHUNK_SIZE)
         ]
-        map_proto = game_pb2.Map(color_map=color_map, map=map_file['map'])
-        return map_proto
 
-def handle_console(server, servicer):
+    def load_map(self, map_name='map.json', room_id=None):
+        map_data = load_json_map(map_name)
+        if map_data is None:
+            return False
+        geometry = MapGeometry(map_data.text_map)
+        collision_grid = geometry.collision_grid
+        self.maps[map_data.hash] = map_data
+        if room_id is not None:
+            return self.rooms.change_map(map_data, collision_grid, room_id)
+        if self.rooms is not None:
+            self.rooms.change_map(map_data, collision_grid)
+        self.collision_grid = collision_grid
+        self.map_data = map_data
+        self.text_map = map_data.text_map
+        self.map = geometry
+        return True
+
+
+def timed(method, behavior):
+    if asyncio.iscoroutinefunction(behavior):
+        async def handler(request, context):
+            start = time.perf_counter()
+            try:
+                return await behavior(request, context)
+            finally:
+                observe_rpc(method, time.perf_counter() - start)
+    else:
+        def handler(request, context):
+            start = time.perf_counter()
+            try:
+                return behavior(request, context)
+            finally:
+                observe_rpc(method, time.perf_counter() - start)
+    return handler
+
+
+def pre_encoded(payload):
+    return payload
+
+
+def add_servicer_to_server(servicer, server):
+    # Same registration as the generated helper, except that Play and Update return bytes that are already
+    # serialized and unary handlers are timed.
+    method_handlers = {
+        'Join': grpc.unary_unary_rpc_method_handler(
+            timed('Join', servicer.Join),
+            request_deserializer=game_pb2.JoinRequest.FromString,
+            response_serializer=game_pb2.JoinResponse.SerializeToString,
+        ),
+        'Leave': grpc.unary_unary_rpc_method_handler(
+            timed('Leave', servicer.Leave),
+            request_deserializer=game_pb2.LeaveRequest.FromString,
+            response_serializer=game_pb2.LeaveResponse.SerializeToString,
+        ),
+        'Update': grpc.unary_unary_rpc_method_handler(
+            timed('Update', servicer.Update),
+            request_deserializer=game_pb2.UpdateRequest.FromString,
+            response_serializer=pre_encoded,
+        ),
+        'Shoot': grpc.unary_unary_rpc_method_handler(
+            timed('Shoot', servicer.Shoot),
+            request_deserializer=game_pb2.ShootRequest.FromString,
+            response_serializer=game_pb2.ShootResponse.SerializeToString,
+        ),
+        'GetMap': grpc.unary_stream_rpc_method_handler(
+            servicer.GetMap,
+            request_deserializer=game_pb2.GetMapRequest.FromString,
+            response_serializer=game_pb2.MapChunk.SerializeToString,
+        ),
+        'Play': grpc.stream_stream_rpc_method_handler(
+            servicer.Play,
+            request_deserializer=game_pb2.UpdateRequest.FromString,
+            response_serializer=pre_encoded,
+        ),
+    }
+    server.add_generic_rpc_handlers((grpc.method_handlers_generic_handler('Game', method_handlers),))
+    server.add_registered_method_handlers('Game', method_handlers)
+
+
+def handle_console(server, servicer, loop=None):
     global RUNNING
+    rooms = servicer.rooms
     while RUNNING:
         raw_command = input().strip()
         command, *args = raw_command.split()
@@ -167,32 +235,67 @@ def handle_console(server, servicer):
         if command == 'exit':
             logger.info("Stopping server...")
             RUNNING = False
-            server.stop(0)
+            rooms.stop()
+            if loop is None:
+                server.stop(0)
+            else:
+                asyncio.run_coroutine_threadsafe(server.stop(0), loop)
             break
         elif command == 'kick':
-            if len(args) != 1:
-                logger.error("Usage: kick <player_id>")
+            if len(args) not in (1, 2):
+                logger.error("Usage: kick [room_id] <player_id>")
                 continue
-            player_id = args[0]
-            if player_id not in servicer.players:
+            player_id = args[-1]
+            if len(args) == 2 and rooms.players.get(player_id) != args[0]:
+                logger.error(f"Player {player_id} is not in room {args[0]}.")
+                continue
+            if not rooms.leave(player_id).result():
                 logger.error(f"Player {player_id} not found.")
                 continue
             logger.info(f"Kicked player {player_id}.")
-            del servicer.players[player_id]
         elif command == 'reloadmap':
-            servicer.map_proto = servicer.create_map_proto_object()
-            logger.info("Map reloaded!")
+            room_id = args[0] if args else None
+            if servicer.load_map(room_id=room_id):
+                logger.info("Map reloaded!" if room_id is None else f"Map reloaded in room {room_id}!")
+            elif room_id is not None:
+                logger.error(f"Room {room_id} not found.")
+        elif command == 'rooms':
+            for room_id, players in list(rooms.room_players.items()):
+                logger.info(f"Room {room_id}: {len(players)} players: {', '.join(sorted(players))}")
+        elif command == 'stats':
+            for room_id, room in list(rooms.rooms.items()):
+                if args and room_id not in args:
+                    continue
+                stats = room.stats
+                if stats is None:
+                    continue
+                logger.info(f"Room {room_id}: {stats.summary()}\n  " + "\n  ".join(stats.details()))
+                logger.info(f"Room {room_id} payloads: {room.snapshots.stats.payload_bytes.summary(1, 'bytes')}")
+            for method, histogram in list(rpc_latencies.items()):
+                logger.info(f"RPC {method}: {histogram.summary()}")
+        elif command in ('netstats', 'tickstats'):
+            for room_id, room in list(rooms.rooms.items()):
+                if args and room_id not in args:
+                    continue
+                if command == 'netstats':
+                    logger.info(f"Room {room_id} snapshots: {room.snapshots.stats.summary()}")
+                    continue
+                stats = room.stats
+                if stats is not None:
+                    logger.info(f"Room {room_id} ticks: {stats.summary()}")
         else:
             logger.error(f"Unknown command: {command}")
 
 
-def serve():
-    servicer = GameServicer()
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
-    game_pb2_grpc.add_GameServicer_to_server(servicer, server)
-    server.add_insecure_port('[::]:12345')
+def serve(tick_rate=TICK_RATE, interest_radius=None, workers=WORKERS, port=PORT, metrics_port=METRICS_PORT):
+    servicer = GameServicer(tick_rate, interest_radius, workers)
+    if metrics_port:
+        serve_metrics(servicer.rooms, metrics_port)
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=MAX_WORKERS))
+    add_servicer_to_server(servicer, server)
+    server.add_insecure_port(f'[::]:{port}')
     server.start()
-    logger.info("Server started on port 12345")
+    logger.info(f"Server started on port {port}, ticking at {tick_rate} Hz with {workers} room workers")
     threading.Thread(target=handle_console, args=[server, servicer]).start()
     server.wait_for_termination()
 
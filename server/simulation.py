@@ -0,0 +1,379 @@
+from collections import deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+from loguru import logger
+import threading
+import asyncio
+import time
+import math
+import numpy as np
+import game_pb2
+from server.snapshots import SnapshotHistory
+from server.physics import (
+    PlayerBuffer, BulletBuffer, PLAYER_HALF_SIZE, grid_array, landed_hits, live_slots, sweep_players, sweep_walls
+)
+from server.spatial_hash import SpatialHash, cell_size_for, aligned_bounds
+from server.interest import InterestManager
+from server.metrics import Histogram
+from movement import move_player, INPUT_STEP
+
+
+TICK_RATE = 60
+SNAPSHOT_RATE = 30
+BULLET_SPEED = 500
+BULLET_DAMAGE = 10
+MAX_PLAYERS = 64
+WORLD_SIZE = (800, 600)
+# Below this many bullet x player pairs the brute-force test beats the spatial hash (benchmarks/broadphase.py).
+BROADPHASE_MIN_PAIRS = 50000
+# After a stall, drop the backlog instead of running a burst of ticks to catch up.
+MAX_CATCH_UP_TICKS = 5
+SPAWN_POSITION = (WORLD_SIZE[0] / 2, WORLD_SIZE[1] / 2)
+# Input time a player may bank while its inputs are late, so jitter doesn't slow it down
+# but a client can't send inputs faster than real time.
+MAX_INPUT_CREDIT = 0.25
+MAX_PENDING_INPUTS = 60
+# More than anyone can click in one 1/60 s step, the rest of a flooded input is dropped.
+MAX_ACTIONS_PER_INPUT = 4
+# Longest a shot is rewound to match what its shooter saw. More favors laggy shooters over the players they hit.
+MAX_REWIND = 0.2
+
+
+class TickStats:
+    def __init__(self, tick_rate):
+        self.budget = 1 / tick_rate
+        self.ticks = 0
+        self.total_seconds = 0
+        self.max_seconds = 0
+        self.overruns = 0
+        self.dropped_ticks = 0
+        self.tick = Histogram()
+        self.phases = {}
+        self.players = 0
+        self.bullets = 0
+
+    def record(self, seconds):
+        self.ticks += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.tick.observe(seconds)
+        if seconds > self.budget:
+            self.overruns += 1
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        yield
+        histogram = self.phases.get(name)
+        if histogram is None:
+            histogram = self.phases[name] = Histogram()
+        histogram.observe(time.perf_counter() - start)
+
+    def details(self):
+        lines = [f"tick {self.tick.summary()}", f"players={self.players} bullets={self.bullets}"]
+        lines.extend(f"{name} {histogram.summary()}" for name, histogram in self.phases.items())
+        return lines
+
+    def summary(self):
+        average_ms = self.total_seconds / self.ticks * 1000 if self.ticks else 0
+        return (
+            f"ticks={self.ticks} avg={average_ms:.3f} ms max={self.max_seconds * 1000:.3f} ms "
+            f"budget={self.budget * 1000:.1f} ms overruns={self.overruns} dropped={self.dropped_ticks}"
+        )
+
+
+class Simulation:
+    def __init__(self, collision_grid, tick_rate=TICK_RATE, interest_radius=None, map_hash='', snapshots=None):
+        self.tick_rate = tick_rate
+        self.dt = 1 / tick_rate
+        self.snapshot_interval = max(1, round(tick_rate / SNAPSHOT_RATE))
+        self.map_change = None
+        self.swap_map(self.prepare_map(collision_grid), map_hash)
+
+        self.max_rewind_ticks = round(MAX_REWIND * tick_rate)
+        self.players = PlayerBuffer(MAX_PLAYERS, self.max_rewind_ticks + 1)
+        self.bullets = BulletBuffer()
+        # Protobuf messages only exist at the snapshot edge, built once per bullet.
+        self.bullet_owner_ids = {}
+        self.bullet_messages = {}
+        self.bullet_ends = []
+        self.bullet_id_counter = 0
+        # Without a radius every client is sent the whole world.
+        self.interest = InterestManager(interest_radius, (0, 0, *WORLD_SIZE)) if interest_radius else None
+        self.tick = 0
+
+        # RPC threads only append here, the tick thread drains it at the start of every tick.
+        self.inputs = deque()
+        # A room in a worker process publishes into a forwarder instead of its own history.
+        self.snapshots = snapshots if snapshots is not None else SnapshotHistory()
+        self.acked_snapshots = {}
+        self.stats = TickStats(tick_rate)
+        self.running = False
+        self.stopped = False
+        self.thread = None
+        self.task = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run)
+        self.thread.start()
+
+    def start_task(self):
+        self.running = True
+        self.task = asyncio.get_running_loop().create_task(self.run_async())
+
+    def stop(self):
+        self.running = False
+        self.stopped = True
+        self.fail_inputs()
+
+    def fail_inputs(self):
+        # Nothing will apply what is still queued, its waiters are told instead of blocking forever.
+        while True:
+            try:
+                command, args, future = self.inputs.popleft()
+            except IndexError:
+                return
+            future.set_exception(RuntimeError("Room stopped"))
+
+    def submit(self, command, *args):
+        future = Future()
+        self.inputs.append((command, args, future))
+        # Checked after queueing, so an input racing stop() is failed by one of the two.
+        if self.stopped:
+            self.fail_inputs()
+        return future
+
+    def join(self, player_id):
+        return self.submit(self.add_player, player_id)
+
+    def leave(self, player_id):
+        return self.submit(self.remove_player, player_id)
+
+    def update(self, request):
+        self.submit(self.update_player, request)
+
+    def shoot(self, player_id):
+        self.submit(self.spawn_bullet, player_id)
+
+    def change_map(self, collision_grid, map_hash=''):
+        # Built on the caller's thread, the tick only swaps the finished structures in.
+        return self.submit(self.swap_map, self.prepare_map(collision_grid), map_hash)
+
+    def run(self):
+        logger.info("Update thread started!")
+        previous = time.perf_counter()
+        accumulator = 0
+        while self.running:
+            current = time.perf_counter()
+            accumulator = self.catch_up(accumulator + current - previous)
+            previous = current
+            time.sleep(max(self.dt - accumulator, 0))
+
+    async def run_async(self):
+        logger.info("Update task started!")
+        previous = time.perf_counter()
+        accumulator = 0
+        while self.running:
+            current = time.perf_counter()
+            accumulator = self.catch_up(accumulator + current - previous)
+            previous = current
+            await asyncio.sleep(max(self.dt - accumulator, 0))
+
+    def catch_up(self, accumulator):
+        if accumulator > MAX_CATCH_UP_TICKS * self.dt:
+            self.stats.dropped_ticks += int(accumulator / self.dt) - MAX_CATCH_UP_TICKS
+            accumulator = MAX_CATCH_UP_TICKS * self.dt
+
+        while accumulator >= self.dt:
+            start = time.perf_counter()
+            self.step()
+            self.stats.record(time.perf_counter() - start)
+            accumulator -= self.dt
+        return accumulator
+
+    def step(self):
+        with self.stats.phase('inputs'):
+            self.apply_inputs()
+        with self.stats.phase('movement'):
+            self.move_players()
+        self.tick += 1
+        self.players.record(self.tick)
+        with self.stats.phase('bullets'):
+            self.update_bullets(self.dt)
+        if self.tick % self.snapshot_interval == 0:
+            with self.stats.phase('snapshot'):
+                self.publish_snapshot()
+        self.stats.players = len(self.players)
+        self.stats.bullets = self.bullets.count
+
+    def apply_inputs(self):
+        # Only what was queued before this tick started, late inputs wait for the next one.
+        for _ in range(len(self.inputs)):
+            try:
+                command, args, future = self.inputs.popleft()
+            except IndexError:
+                # Drained by stop(), which a finished input can trigger by closing the room.
+                break
+            try:
+                future.set_result(command(*args))
+            except Exception as e:
+                logger.exception(f"Input {command.__name__} failed")
+                future.set_exception(e)
+
+    def publish_snapshot(self):
+        bullets = self.bullets
+        messages = []
+        for i in range(bullets.count):
+            bullet_id = int(bullets.ids[i])
+            message = self.bullet_messages.get(bullet_id)
+            if message is None:
+                message = bullets.message(i, self.bullet_owner_ids[bullet_id])
+                self.bullet_messages[bullet_id] = message
+            messages.append(message)
+
+        views = None
+        if self.interest is not None:
+            views = self.interest.views(self.players, bullets.ids[:bullets.count], bullets.positions[:bullets.count])
+
+        bullet_ends, self.bullet_ends = self.bullet_ends, []
+        self.snapshots.record(self.tick, self.players.states(), messages, bullet_ends, views, self.map_change)
+
+    def add_player(self, player_id):
+        if player_id in self.players:
+            return False, "Player ID already exists!"
+        if self.players.add(player_id, hp=100, position=SPAWN_POSITION) is None:
+            return False, "Server is full!"
+        logger.info(f"Added player {player_id} to the game.")
+        return True, "Successfully joined the game!"
+
+    def remove_player(self, player_id):
+        if player_id not in self.players:
+            return False
+        self.players.remove(player_id)
+        self.acked_snapshots.pop(player_id, None)
+        return True
+
+    def update_player(self, request):
+        slot = self.players.slots.get(request.client_id)
+        if slot is None:
+            return
+        pending = self.players.pending_inputs[slot]
+        last_seq = pending[-1].seq if pending else self.players.last_inputs[slot]
+        for move in request.inputs:
+            if move.seq > last_seq:
+                pending.append(move)
+                last_seq = move.seq
+        while len(pending) > MAX_PENDING_INPUTS:
+            pending.popleft()
+        if not request.inputs:
+            self.players.directions[slot] = request.direction
+        if request.ack_snapshot_id > self.acked_snapshots.get(request.client_id, 0):
+            self.acked_snapshots[request.client_id] = request.ack_snapshot_id
+
+    def move_players(self):
+        players = self.players
+        for player_id, slot in players.slots.items():
+            pending = players.pending_inputs[slot]
+            credit = min(players.input_credit[slot] + self.dt, MAX_INPUT_CREDIT)
+            while pending and credit >= INPUT_STEP - 1e-9:
+                move = pending.popleft()
+                credit -= INPUT_STEP
+                # Dead players' inputs are still acknowledged, they just don't move anything.
+                if players.hps[slot] > 0:
+                    x, y = players.positions[slot]
+                    players.positions[slot] = move_player(self.collision_grid, x, y, move.move_x, move.move_y)
+                    players.directions[slot] = move.direction
+                    # Right after the step they were made in, so a shot leaves from where the player saw itself.
+                    for action in move.actions[:MAX_ACTIONS_PER_INPUT]:
+                        if action.type == game_pb2.SHOOT:
+                            self.spawn_bullet(player_id, move.view_tick)
+                players.last_inputs[slot] = move.seq
+            players.input_credit[slot] = credit
+
+    def prepare_map(self, collision_grid):
+        solid = grid_array(collision_grid)
+        # Cells at least as big as a player box, so a hit is always within one cell of the player's center.
+        cell_size = cell_size_for(collision_grid.pixels_per_block, PLAYER_HALF_SIZE * 2)
+        spatial_hash = SpatialHash(cell_size, aligned_bounds(collision_grid.origin, cell_size, *WORLD_SIZE))
+        return collision_grid, solid, spatial_hash
+
+    def swap_map(self, prepared, map_hash=''):
+        self.collision_grid, self.solid, self.spatial_hash = prepared
+        version = self.map_change.version + 1 if self.map_change else 1
+        self.map_change = game_pb2.MapChange(version=version, map_hash=map_hash)
+        if version > 1:
+            logger.info(f"Map changed to version {version} ({map_hash[:12]}) at tick {self.tick}.")
+
+    def spawn_bullet(self, player_id, view_tick=0):
+        slot = self.players.slots.get(player_id)
+        if slot is None:
+            return False
+
+        rewind = 0
+        if view_tick:
+            rewind = min(max(self.tick - view_tick, 0), self.max_rewind_ticks)
+
+        direction = self.players.directions[slot]
+        bullet_id = self.bullet_id_counter
+        self.bullet_id_counter += 1
+        self.bullets.add(
+            bullet_id, self.players.uids[slot], self.tick,
+            self.players.positions[slot], (math.cos(direction), math.sin(direction)), rewind
+        )
+        self.bullet_owner_ids[bullet_id] = player_id
+        return True
+
+    def update_bullets(self, dt):
+        bullets = self.bullets
+        count = bullets.count
+        if count == 0:
+            return
+
+        # Whole path of this tick is tested, so lower tick rates don't let bullets tunnel through anything.
+        starts = bullets.positions[:count].copy()
+        ends = bullets.positions[:count]
+        ends += bullets.directions[:count] * (BULLET_SPEED * dt)
+
+        with self.stats.phase('sweep_walls'):
+            wall_times = sweep_walls(self.collision_grid, self.solid, starts, ends)
+        with self.stats.phase('sweep_players'):
+            slots = live_slots(self.players)
+            spatial_hash = None
+            if count * len(slots) >= BROADPHASE_MIN_PAIRS:
+                spatial_hash = self.spatial_hash
+                spatial_hash.rebuild(self.players.positions[slots], slots, PLAYER_HALF_SIZE)
+            hit, targets, hit_times = sweep_players(
+                self.players, starts, ends, bullets.owners[:count], spatial_hash, bullets.rewinds[:count], self.tick
+            )
+
+        hit &= hit_times <= wall_times
+        hit = landed_hits(hit, targets, hit_times, self.players.hps, BULLET_DAMAGE)
+        in_wall = ~hit & np.isfinite(wall_times)
+        xs, ys = ends[:, 0], ends[:, 1]
+        # too bad, will break if client's map size changes
+        out_of_bounds = ~hit & ~in_wall & ((xs < 0) | (xs > WORLD_SIZE[0]) | (ys < 0) | (ys > WORLD_SIZE[1]))
+
+        ended = out_of_bounds | in_wall | hit
+        if not ended.any():
+            return
+
+        np.subtract.at(self.players.hps, targets[hit], BULLET_DAMAGE)
+        np.maximum(self.players.hps, 0, out=self.players.hps)
+
+        end_times = np.where(hit, hit_times, np.where(in_wall, wall_times, 1))
+        end_positions = starts + (ends - starts) * end_times[:, None]
+        reasons = np.where(out_of_bounds, game_pb2.OUT_OF_BOUNDS, np.where(in_wall, game_pb2.WALL, game_pb2.HIT))
+        for i in np.flatnonzero(ended):
+            bullet_id = int(bullets.ids[i])
+            self.bullet_owner_ids.pop(bullet_id, None)
+            self.bullet_messages.pop(bullet_id, None)
+            self.bullet_ends.append(game_pb2.BulletEnd(
+                bullet_id=bullet_id,
+                reason=int(reasons[i]),
+                position=game_pb2.Vec2(x=end_positions[i, 0], y=end_positions[i, 1]),
+                hit_player=self.players.ids[targets[i]] if hit[i] else '',
+                tick=self.tick
+            ))
+
+        bullets.keep(~ended)
@@ -0,0 +1,187 @@
+import threading
+import time
+import game_pb2
+from server.metrics import Histogram, BYTES_BUCKETS
+
+
+# About two seconds of snapshots at 30 Hz. Clients acking anything older get a full snapshot.
+SNAPSHOT_HISTORY = 64
+
+
+class Snapshot:
+    def __init__(self, snapshot_id, server_tick, players, bullets, views=None, map_change=None):
+        self.snapshot_id = snapshot_id
+        self.server_tick = server_tick
+        self.map_change = map_change
+        # The simulation hands over messages it never touches again, so they are kept as is.
+        self.players = {state.client_id: state for state in players}
+        self.bullets = {bullet.bullet_id: bullet for bullet in bullets}
+        # client_id -> (player ids, bullet ids) in that client's area of interest. Clients without a view see everything.
+        self.views = views or {}
+
+    def visible(self, client_id):
+        view = self.views.get(client_id)
+        if view is None:
+            return self.players, self.bullets
+        player_ids, bullet_ids = view
+        return (
+            {player_id: self.players[player_id] for player_id in player_ids},
+            {bullet_id: self.bullets[bullet_id] for bullet_id in bullet_ids}
+        )
+
+    def full(self, client_id=None):
+        players, bullets = self.visible(client_id)
+        return game_pb2.UpdateResponse(
+            snapshot_id=self.snapshot_id,
+            server_tick=self.server_tick,
+            states=players.values(),
+            bullets=bullets.values(),
+            map_change=self.map_change
+        )
+
+    # Bullets never change after spawning, so a delta only carries spawns and ends.
+    # Entities entering or leaving the client's interest show up as spawns and removals.
+    def delta(self, baseline, bullet_ends, client_id=None):
+        players, bullets = self.visible(client_id)
+        base_players, base_bullets = baseline.visible(client_id)
+        return game_pb2.UpdateResponse(
+            snapshot_id=self.snapshot_id,
+            baseline_id=baseline.snapshot_id,
+            server_tick=self.server_tick,
+            states=[state for player_id, state in players.items() if base_players.get(player_id) != state],
+            bullets=[bullet for bullet_id, bullet in bullets.items() if bullet_id not in base_bullets],
+            removed_players=[player_id for player_id in base_players if player_id not in players],
+            bullet_ends=[
+                bullet_ends.get(bullet_id) or game_pb2.BulletEnd(bullet_id=bullet_id)
+                for bullet_id in base_bullets if bullet_id not in bullets
+            ],
+            map_change=self.map_change if self.map_change != baseline.map_change else None
+        )
+
+
+class SnapshotStats:
+    def __init__(self):
+        self.full_sent = 0
+        self.delta_sent = 0
+        self.bytes_sent = 0
+        self.full_equivalent_bytes = 0
+        # What was sent to clients for which full_equivalent_bytes is known.
+        self.compared_bytes = 0
+        self.encode_seconds = 0
+        self.encodes = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.payload_bytes = Histogram(BYTES_BUCKETS)
+
+    def summary(self):
+        saved = 1 - self.compared_bytes / self.full_equivalent_bytes if self.full_equivalent_bytes else 0
+        encode_ms = self.encode_seconds / self.encodes * 1000 if self.encodes else 0
+        lookups = self.cache_hits + self.cache_misses
+        hit_rate = self.cache_hits / lookups if lookups else 0
+        return (
+            f"full={self.full_sent} delta={self.delta_sent} "
+            f"bytes={self.bytes_sent} full_equivalent={self.full_equivalent_bytes} saved={saved:.1%} "
+            f"encodes={self.encodes} cache_hits={self.cache_hits} cache_misses={self.cache_misses} "
+            f"hit_rate={hit_rate:.1%} encode_avg={encode_ms:.3f} ms"
+        )
+
+
+class SnapshotHistory:
+    def __init__(self, size=SNAPSHOT_HISTORY):
+        self.size = size
+        self.snapshots = {}
+        self.latest = None
+        self.encoded = {}
+        self.bullet_ends = {}
+        self.bullet_ended_in = {}
+        self.stats = SnapshotStats()
+        self.condition = threading.Condition()
+        # Called with the new snapshot id after every record, from whichever thread recorded it.
+        self.listeners = []
+
+    def record(self, server_tick, players, bullets, bullet_ends, views=None, map_change=None):
+        snapshot_id = self.latest.snapshot_id + 1 if self.latest else 1
+        snapshot = Snapshot(snapshot_id, server_tick, players, bullets, views, map_change)
+
+        with self.condition:
+            self.snapshots[snapshot_id] = snapshot
+            self.snapshots.pop(snapshot_id - self.size, None)
+            # An end only has to outlive the oldest baseline that could still contain its bullet.
+            for bullet_end in bullet_ends:
+                self.bullet_ends[bullet_end.bullet_id] = bullet_end
+                self.bullet_ended_in[bullet_end.bullet_id] = snapshot_id
+            expired = [bullet_id for bullet_id, ended_in in self.bullet_ended_in.items() if ended_in <= snapshot_id - self.size]
+            for bullet_id in expired:
+                del self.bullet_ends[bullet_id]
+                del self.bullet_ended_in[bullet_id]
+            self.latest = snapshot
+            # Clients acking the same baseline with the same view share one encoded payload.
+            # The whole world is only encoded once a client without a view needs it.
+            self.encoded = {}
+            self.condition.notify_all()
+        for listener in self.listeners:
+            listener(snapshot_id)
+        return snapshot
+
+    def wait_for_newer(self, seen_id, timeout=0.1):
+        with self.condition:
+            self.condition.wait_for(lambda: self.latest is not None and self.latest.snapshot_id > seen_id, timeout)
+            return self.latest.snapshot_id if self.latest else 0
+
+    # Payloads are cached per snapshot, so every caller asking for the same thing during a tick gets the same bytes.
+    def encode(self, baseline_id, client_id=None):
+        with self.condition:
+            latest = self.latest
+            if latest is None:
+                return 0, b''
+            # A client that already has the latest snapshot gets an empty delta against it, not everything again.
+            baseline = self.snapshots.get(baseline_id)
+            if baseline is None:
+                baseline_id = 0
+            view = latest.views.get(client_id)
+            key = (baseline_id, None if view is None else (view, baseline.views.get(client_id) if baseline_id else None))
+            payload = self.encoded.get(key)
+            full = self.encoded.get((0, None))
+            bullet_ends = dict(self.bullet_ends) if payload is None else None
+
+        cached = payload is not None
+        encodes = 0
+        start = time.perf_counter()
+        # Clients without a view are measured against the whole world, so theirs is encoded for the stats too.
+        if full is None and view is None:
+            full = latest.full().SerializeToString()
+            encodes += 1
+        if payload is None:
+            if key == (0, None):
+                payload = full
+            elif baseline_id == 0:
+                payload = latest.full(client_id).SerializeToString()
+                encodes += 1
+            else:
+                payload = latest.delta(baseline, bullet_ends, client_id).SerializeToString()
+                encodes += 1
+        encode_seconds = time.perf_counter() - start
+
+        with self.condition:
+            if cached:
+                self.stats.cache_hits += 1
+            else:
+                self.stats.cache_misses += 1
+            if encodes:
+                self.stats.encode_seconds += encode_seconds
+                self.stats.encodes += encodes
+                if self.latest is latest:
+                    self.encoded[key] = payload
+                    if full is not None:
+                        self.encoded[(0, None)] = full
+
+            if baseline_id == 0:
+                self.stats.full_sent += 1
+            else:
+                self.stats.delta_sent += 1
+            self.stats.bytes_sent += len(payload)
+            self.stats.payload_bytes.observe(len(payload))
+            if full is not None:
+                self.stats.full_equivalent_bytes += len(full)
+                self.stats.compared_bytes += len(payload)
+        return latest.snapshot_id, payload
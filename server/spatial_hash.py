@@ -0,0 +1,106 @@
+import math
+import numpy as np
+
+
+# Largest hash cell. Big tiles are split into whole fractions so cells stay aligned with the map grid.
+MAX_CELL_SIZE = 50
+
+
+def cell_size_for(pixels_per_block, min_size):
+    cell_size = pixels_per_block / math.ceil(pixels_per_block / MAX_CELL_SIZE)
+    return max(cell_size, min_size)
+
+
+def aligned_bounds(origin, cell_size, width, height):
+    # Bounds covering (0, 0, width, height) whose cell edges line up with the map's tiles.
+    left = origin[0] - math.ceil(origin[0] / cell_size) * cell_size
+    top = origin[1] - math.ceil(origin[1] / cell_size) * cell_size
+    return left, top, width, height
+
+
+class SpatialHash:
+    # The world is bounded, so the "hash" is a dense cell table: players sorted by cell plus a start/count per cell.
+    def __init__(self, cell_size, bounds):
+        left, top, right, bottom = bounds
+        self.cell_size = cell_size
+        self.origin = (left, top)
+        self.columns = max(1, math.ceil((right - left) / cell_size))
+        self.rows = max(1, math.ceil((bottom - top) / cell_size))
+        self.starts = np.zeros(self.columns * self.rows, dtype=np.int64)
+        self.counts = np.zeros(self.columns * self.rows, dtype=np.int64)
+        self.sorted_slots = np.zeros(0, dtype=np.int64)
+
+    def cells(self, xs, ys):
+        cell_x = np.floor((xs - self.origin[0]) / self.cell_size).astype(np.int64)
+        cell_y = np.floor((ys - self.origin[1]) / self.cell_size).astype(np.int64)
+        return cell_x, cell_y
+
+    def rebuild(self, positions, slots, half_size):
+        # Every box goes into each cell it overlaps (at most four, as boxes are never larger than a cell),
+        # so a point only has to look at its own cell.
+        xs, ys = positions[:, 0], positions[:, 1]
+        first_x, first_y = self.cells(xs - half_size, ys - half_size)
+        last_x, last_y = self.cells(xs + half_size, ys + half_size)
+
+        cell_x = np.concatenate((first_x, last_x, first_x, last_x))
+        cell_y = np.concatenate((first_y, first_y, last_y, last_y))
+        entry_slots = np.tile(slots, 4)
+        keep = np.concatenate((
+            np.ones(len(slots), dtype=bool), last_x != first_x, last_y != first_y,
+            (last_x != first_x) & (last_y != first_y)
+        ))
+        keep &= (cell_x >= 0) & (cell_x < self.columns) & (cell_y >= 0) & (cell_y < self.rows)
+
+        cell_ids = (cell_y * self.columns + cell_x)[keep]
+        order = np.argsort(cell_ids, kind='stable')
+        self.sorted_slots = entry_slots[keep][order]
+        self.counts = np.bincount(cell_ids, minlength=self.columns * self.rows)
+        self.starts = np.cumsum(self.counts) - self.counts
+
+    def gather(self, point_ids, cell_x, cell_y):
+        inside = (cell_x >= 0) & (cell_x < self.columns) & (cell_y >= 0) & (cell_y < self.rows)
+        point_ids = point_ids[inside]
+        cell_ids = cell_y[inside] * self.columns + cell_x[inside]
+        counts = self.counts[cell_ids]
+        total = int(counts.sum())
+        run_offsets = np.repeat(self.starts[cell_ids] - np.cumsum(counts) + counts, counts)
+        return np.repeat(point_ids, counts), self.sorted_slots[run_offsets + np.arange(total)]
+
+    def query(self, points, reach=0):
+        # Pairs (point index, slot) for every box registered in the point's cell and the `reach` cells around it.
+        empty = np.zeros(0, dtype=np.int64)
+        if len(points) == 0 or len(self.sorted_slots) == 0:
+            return empty, empty
+
+        cell_x, cell_y = self.cells(points[:, 0], points[:, 1])
+        point_ids = np.arange(len(points))
+        pairs = [
+            self.gather(point_ids, cell_x + offset_x, cell_y + offset_y)
+            for offset_y in range(-reach, reach + 1)
+            for offset_x in range(-reach, reach + 1)
+        ]
+        return np.concatenate([p for p, _ in pairs]), np.concatenate([s for _, s in pairs])
+
+    def query_segments(self, starts, ends):
+        # Pairs (segment index, slot) for every box registered in a cell the segment's bounding box touches.
+        empty = np.zeros(0, dtype=np.int64)
+        if len(starts) == 0 or len(self.sorted_slots) == 0:
+            return empty, empty
+
+        first_x, first_y = self.cells(np.minimum(starts[:, 0], ends[:, 0]), np.minimum(starts[:, 1], ends[:, 1]))
+        last_x, last_y = self.cells(np.maximum(starts[:, 0], ends[:, 0]), np.maximum(starts[:, 1], ends[:, 1]))
+        if max((last_x - first_x).max(), (last_y - first_y).max()) > 1:
+            # Long segments (low tick rate, small cells): every point is within half the length of the midpoint.
+            half_length = np.sqrt(((ends - starts) ** 2).sum(axis=1)).max() / 2
+            return self.query((starts + ends) / 2, int(np.ceil(half_length / self.cell_size)))
+
+        # Short segments span at most 2x2 cells.
+        point_ids = np.arange(len(starts))
+        step_x, step_y = last_x != first_x, last_y != first_y
+        pairs = [
+            self.gather(point_ids, first_x, first_y),
+            self.gather(point_ids[step_x], last_x[step_x], first_y[step_x]),
+            self.gather(point_ids[step_y], first_x[step_y], last_y[step_y]),
+            self.gather(point_ids[step_x & step_y], last_x[step_x & step_y], last_y[step_x & step_y]),
+        ]
+        return np.concatenate([p for p, _ in pairs]), np.concatenate([s for _, s in pairs])